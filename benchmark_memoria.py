@@ -0,0 +1,116 @@
+"""
+Benchmark de memoria para la información de playlists grandes
+
+Compara la representación anterior (lista de diccionarios + información cruda
+de yt-dlp retenida) con la actual (PlaylistEntry con __slots__ y liberación de
+la información cruda) sobre una playlist sintética. Termina con error si
+la reducción de memoria retenida no llega a REDUCCION_MINIMA.
+
+Uso:
+    python benchmark_memoria.py [numero_de_entradas]
+"""
+import gc
+import sys
+import tracemalloc
+
+from logic import PlaylistEntry
+
+# Reducción mínima de la memoria retenida que debe conseguir la representación actual
+REDUCCION_MINIMA = 0.60
+
+
+def crear_playlist_sintetica(total: int) -> dict:
+    """
+    Genera un diccionario con la forma que devuelve yt-dlp para una playlist plana
+    """
+    entries = []
+    for i in range(total):
+        video_id = f"vid{i:08d}"
+        entries.append({
+            '_type': 'url',
+            'ie_key': 'Youtube',
+            'id': video_id,
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'title': f"Video de prueba número {i} con un título de longitud normal",
+            'description': None,
+            'duration': 60 + i % 3600,
+            'channel_id': 'UC0000000000000000000000',
+            'channel': 'Canal de prueba',
+            'uploader': 'Canal de prueba',
+            'view_count': i * 17,
+            'thumbnails': [
+                {'url': f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg", 'height': 360, 'width': 480},
+                {'url': f"https://i.ytimg.com/vi/{video_id}/maxresdefault.jpg", 'height': 720, 'width': 1280},
+            ],
+        })
+    return {
+        '_type': 'playlist',
+        'id': 'PL_SINTETICA',
+        'title': 'Playlist sintética',
+        'uploader': 'Canal de prueba',
+        'entries': entries,
+    }
+
+
+def procesar_como_antes(info: dict) -> dict:
+    """
+    Reproduce el procesamiento anterior: un diccionario por entrada
+    """
+    videos = []
+    for i, entry in enumerate(info.get('entries', []), 1):
+        if entry:
+            videos.append({
+                'index': i,
+                'title': entry.get('title', f'Video {i}'),
+                'duration': entry.get('duration', 0)
+            })
+    return {
+        'type': 'playlist',
+        'title': info.get('title', 'Sin título'),
+        'uploader': info.get('uploader', 'Desconocido'),
+        'total_videos': len(videos),
+        'videos': videos
+    }
+
+
+def medir(nombre: str, total: int, funcion) -> int:
+    """
+    Mide la memoria retenida tras procesar la playlist
+    """
+    gc.collect()
+    tracemalloc.start()
+    retenido = funcion(crear_playlist_sintetica(total))
+    gc.collect()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<12} retenido: {actual / (1024 * 1024):8.1f} MB   pico: {pico / (1024 * 1024):8.1f} MB")
+    del retenido
+    return actual
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    def antes(info):
+        # La GUI conservaba la información procesada junto a la cruda
+        return info, procesar_como_antes(info)
+
+    def ahora(info):
+        # Lo mismo que hace VideoDownloader._process_playlist_info
+        videos = PlaylistEntry.from_playlist(info)
+        info.clear()
+        return videos
+
+    print(f"📋 Playlist sintética de {total} entradas")
+    memoria_antes = medir("Antes", total, antes)
+    memoria_ahora = medir("Ahora", total, ahora)
+    reduccion = 1 - memoria_ahora / memoria_antes
+    print(f"📉 Reducción: {reduccion * 100:.1f}%")
+    if reduccion < REDUCCION_MINIMA:
+        print(f"❌ La reducción no llega al {REDUCCION_MINIMA * 100:.0f}% esperado")
+        sys.exit(1)
+    print("✅ Reducción suficiente")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark de la descarga por segmentos
+
+Levanta un servidor HTTP local que admite rangos y limita la velocidad de
+cada conexión, y compara la descarga de un archivo progresivo con una sola
+conexión frente a varias. También comprueba que una descarga interrumpida
+continúa desde el avance guardado de cada segmento. Termina con error si
+algún archivo descargado no coincide con el original o si la reanudación
+vuelve a pedir bytes que ya estaban descargados.
+
+Uso:
+    python benchmark_segmentos.py [tamaño_MB] [conexiones]
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yt_dlp
+
+from logic import SegmentedYoutubeDL
+
+# Velocidad máxima por conexión del servidor de prueba (bytes/s)
+VELOCIDAD_POR_CONEXION = 2 * 1024 * 1024
+
+
+def crear_servidor(datos: bytes) -> ThreadingHTTPServer:
+    """
+    Servidor que sirve /video.mp4 con soporte de Range y velocidad limitada
+
+    Cuenta en bytes_servidos el contenido enviado en respuestas a peticiones
+    con Range (las del descargador; el extractor genérico hace además una
+    petición normal al analizar la URL) y en activas las respuestas que aún
+    se están enviando.
+    """
+    contador = threading.Lock()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(solo_cabeceras=True)
+
+        def do_GET(self, solo_cabeceras=False):
+            inicio, fin = 0, len(datos) - 1
+            rango = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range') or '')
+            if rango:
+                inicio = int(rango.group(1))
+                fin = min(int(rango.group(2)) if rango.group(2) else fin, len(datos) - 1)
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {inicio}-{fin}/{len(datos)}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(fin - inicio + 1))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+            if solo_cabeceras:
+                return
+
+            bloque = 64 * 1024
+            with contador:
+                self.server.activas += 1
+            try:
+                for posicion in range(inicio, fin + 1, bloque):
+                    trozo = datos[posicion:min(posicion + bloque, fin + 1)]
+                    self.wfile.write(trozo)
+                    if rango:
+                        with contador:
+                            self.server.bytes_servidos += len(trozo)
+                    time.sleep(bloque / VELOCIDAD_POR_CONEXION)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with contador:
+                    self.server.activas -= 1
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    servidor.daemon_threads = True
+    servidor.bytes_servidos = 0
+    servidor.activas = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def descargar(url: str, carpeta: str, conexiones: int, cancelar_en: float = None) -> float:
+    """
+    Descarga la URL y devuelve los segundos empleados
+
+    Args:
+        cancelar_en: Fracción del archivo a partir de la cual se interrumpe
+    """
+    def hook(d):
+        if cancelar_en and d['status'] == 'downloading' and d.get('total_bytes'):
+            if d['downloaded_bytes'] >= d['total_bytes'] * cancelar_en:
+                raise yt_dlp.utils.DownloadCancelled("interrupción de prueba")
+
+    opciones = {
+        'outtmpl': os.path.join(carpeta, '%(title)s.%(ext)s'),
+        'quiet': True,
+        'noprogress': True,
+        'progress_hooks': [hook],
+        'segmented_download': {'connections': conexiones, 'min_size': 1024 * 1024},
+    }
+    inicio = time.time()
+    with SegmentedYoutubeDL(opciones) as ydl:
+        ydl.download([url])
+    return time.time() - inicio
+
+
+def main():
+    tamano = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    conexiones = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    datos = os.urandom(tamano * 1024 * 1024)
+    huella = hashlib.sha1(datos).hexdigest()
+    servidor = crear_servidor(datos)
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/video.mp4"
+
+    fallos = []
+
+    def comprobar(carpeta, prueba):
+        with open(os.path.join(carpeta, 'video.mp4'), 'rb') as f:
+            if hashlib.sha1(f.read()).hexdigest() == huella:
+                return "✅ íntegro"
+        fallos.append(f"{prueba}: el archivo no coincide con el original")
+        return "❌ corrupto"
+
+    print(f"📦 Archivo de {tamano} MB, {VELOCIDAD_POR_CONEXION // (1024 * 1024)} MB/s por conexión")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        segundos = descargar(url, carpeta, 1)
+        print(f"1 conexión:   {segundos:6.1f} s  {comprobar(carpeta, '1 conexión')}")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        segundos = descargar(url, carpeta, conexiones)
+        print(f"{conexiones} conexiones: {segundos:6.1f} s  {comprobar(carpeta, f'{conexiones} conexiones')}")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        try:
+            descargar(url, carpeta, conexiones, cancelar_en=0.5)
+        except yt_dlp.utils.DownloadCancelled:
+            pass
+
+        # Avance guardado de cada segmento al interrumpir
+        with open(os.path.join(carpeta, 'video.mp4.part.segments'), encoding='utf-8') as f:
+            hechos = sum(hecho for _, _, hecho in json.load(f)['segments'])
+        if not hechos:
+            fallos.append("Reanudada: no se guardó avance al interrumpir")
+
+        # Las conexiones cortadas terminan de enviar lo que ya tenían en curso
+        while servidor.activas:
+            time.sleep(0.05)
+        servidor.bytes_servidos = 0
+        segundos = descargar(url, carpeta, conexiones)
+        # Lo pendiente más el byte de la petición que comprueba si hay rangos
+        esperado = len(datos) - hechos + 1
+        if servidor.bytes_servidos > esperado:
+            fallos.append(f"Reanudada: se pidieron {servidor.bytes_servidos} bytes y "
+                          f"solo faltaban {esperado - 1}")
+        print(f"Reanudada:    {segundos:6.1f} s  {comprobar(carpeta, 'Reanudada')} "
+              f"({hechos / (1024 * 1024):.1f} MB ya hechos, "
+              f"{servidor.bytes_servidos / (1024 * 1024):.1f} MB pedidos de nuevo)")
+
+    servidor.shutdown()
+
+    for fallo in fallos:
+        print(f"❌ {fallo}")
+    if fallos:
+        sys.exit(1)
+    print("✅ Descarga por segmentos correcta")
+
+
+if __name__ == "__main__":
+    main()
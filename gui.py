@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import threading
 from datetime import datetime
 from logic import VideoDownloader, check_dependencies
@@ -15,7 +15,7 @@ class VideoDownloaderGUI:
         self.root.title("Descargador de Videos - YouTube & Más")
         # Tamaño deseado de la ventana
         ancho_ventana = 800
-        alto_ventana = 650
+        alto_ventana = 810
 
         # Obtener tamaño de la pantalla
         ancho_pantalla = self.root.winfo_screenwidth()
@@ -50,6 +50,12 @@ class VideoDownloaderGUI:
         
         # Variables de control
         self.current_info = None
+        self.download_reports = {}
+        
+        # Miniaturas mostradas en el panel de información; la generación
+        # descarta las que llegan tarde de un análisis anterior
+        self._info_generation = 0
+        self._thumbnail_photos = []
         self.download_path_var = tk.StringVar(value=os.path.join(os.path.expanduser("~"), "Downloads"))
         
         # Crear la interfaz
@@ -99,6 +105,8 @@ class VideoDownloaderGUI:
         # Crear las pestañas
         self.create_main_tab()
         self.create_log_tab()
+        self.create_queue_tab()
+        self.create_library_tab()
         
         # Sección de botones inferiores (fuera de las pestañas)
         self.create_bottom_buttons(main_frame)
@@ -163,7 +171,258 @@ class VideoDownloaderGUI:
         # Botones de control del log
         ttk.Button(log_buttons_frame, text="🗑️ Limpiar Log", command=self.clear_log).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(log_buttons_frame, text="💾 Guardar Log", command=self.save_log).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(log_buttons_frame, text="📋 Copiar Log", command=self.copy_log).pack(side=tk.LEFT)
+        ttk.Button(log_buttons_frame, text="📋 Copiar Log", command=self.copy_log).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(log_buttons_frame, text="📂 Registros en disco",
+                   command=self.open_log_folder).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(log_buttons_frame, text="📈 Ver perfiles",
+                   command=self.show_profile_reports).pack(side=tk.LEFT)
+        
+        # Perfilado opcional de análisis y descargas
+        self.profiling_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(log_tab_frame, text="📈 Perfilar análisis y descargas (cProfile + tracemalloc)",
+                        variable=self.profiling_var, command=self.toggle_profiling).grid(
+            row=3, column=0, sticky=tk.W, pady=(5, 0)
+        )
+    
+    def create_queue_tab(self):
+        """Crea la pestaña de la cola de descargas"""
+        queue_tab_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(queue_tab_frame, text="📋 Cola")
+        
+        queue_tab_frame.columnconfigure(0, weight=1)
+        queue_tab_frame.rowconfigure(1, weight=1)
+        
+        ttk.Label(queue_tab_frame, text="📋 Cola de Descargas", style='Header.TLabel').grid(
+            row=0, column=0, sticky=tk.W, pady=(0, 10)
+        )
+        
+        # Lista de trabajos
+        columns = ("position", "url", "host", "type", "priority", "status", "start")
+        self.queue_tree = ttk.Treeview(queue_tab_frame, columns=columns, show="headings", height=12)
+        headings = {
+            "position": ("Pos.", 50),
+            "url": ("URL", 230),
+            "host": ("Sitio", 90),
+            "type": ("Tipo", 90),
+            "priority": ("Prioridad", 80),
+            "status": ("Estado", 90),
+            "start": ("Inicio estimado", 110),
+        }
+        for column, (text, width) in headings.items():
+            self.queue_tree.heading(column, text=text)
+            self.queue_tree.column(column, width=width, stretch=(column == "url"))
+        self.queue_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        scrollbar = ttk.Scrollbar(queue_tab_frame, orient=tk.VERTICAL, command=self.queue_tree.yview)
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.queue_tree.configure(yscrollcommand=scrollbar.set)
+        
+        # Controles de la cola
+        queue_buttons_frame = ttk.Frame(queue_tab_frame)
+        queue_buttons_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        ttk.Label(queue_buttons_frame, text="Descargas simultáneas:").pack(side=tk.LEFT)
+        self.max_workers_var = tk.IntVar(value=self.downloader.scheduler.max_workers)
+        ttk.Spinbox(queue_buttons_frame, from_=1, to=8, width=4, textvariable=self.max_workers_var,
+                    command=self.change_max_workers).pack(side=tk.LEFT, padx=(5, 0))
+        
+        ttk.Label(queue_buttons_frame, text="Máx. por sitio:").pack(side=tk.LEFT, padx=(15, 0))
+        self.max_per_host_var = tk.IntVar(value=self.downloader.scheduler.max_per_host)
+        ttk.Spinbox(queue_buttons_frame, from_=1, to=8, width=4, textvariable=self.max_per_host_var,
+                    command=self.change_max_per_host).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Hilos o procesos de trabajo para analizar y descargar
+        ttk.Label(queue_buttons_frame, text="Ejecutar en:").pack(side=tk.LEFT, padx=(15, 0))
+        self.worker_backend_var = tk.StringVar(
+            value="Procesos" if self.downloader.worker_backend == "process" else "Hilos")
+        backend_combo = ttk.Combobox(queue_buttons_frame, textvariable=self.worker_backend_var,
+                                     state="readonly", width=9, values=("Hilos", "Procesos"))
+        backend_combo.pack(side=tk.LEFT, padx=(5, 0))
+        backend_combo.bind("<<ComboboxSelected>>", lambda event: self.change_worker_backend())
+        
+        ttk.Button(queue_buttons_frame, text="⏹️ Cancelar seleccionado",
+                   command=self.cancel_selected_job).pack(side=tk.RIGHT)
+        
+        self._refresh_queue()
+    
+    def _refresh_queue(self):
+        """Actualiza la lista de trabajos cada segundo"""
+        status_labels = {
+            "queued": "En cola",
+            "running": "Descargando",
+            "paused": "En pausa",
+            "completed": "Completada",
+            "incomplete": "Incompleta",
+            "error": "Error",
+            "cancelled": "Cancelada",
+        }
+        type_labels = {"single": "Video", "playlist": "Playlist", "sync": "Sincronización"}
+        priority_labels = {"high": "Alta", "normal": "Normal", "low": "Baja"}
+        
+        selection = self.queue_tree.selection()
+        self.queue_tree.delete(*self.queue_tree.get_children())
+        for job in self.downloader.get_jobs():
+            start = ""
+            if job['expected_start']:
+                start = datetime.fromtimestamp(job['expected_start']).strftime("%H:%M:%S")
+            self.queue_tree.insert("", tk.END, iid=job['job_id'], values=(
+                job['position'] or "",
+                job['url'],
+                job['host'],
+                type_labels.get(job['download_type'], job['download_type']),
+                priority_labels.get(job['priority'], job['priority']),
+                status_labels.get(job['status'], job['status']),
+                start
+            ))
+        self.queue_tree.selection_set([iid for iid in selection if self.queue_tree.exists(iid)])
+        
+        summary = self.downloader.get_queue_progress()
+        if summary['eta'] is not None:
+            text = (f"📋 Cola: {summary['jobs_active']} en curso, {summary['jobs_queued']} en espera · "
+                    f"{summary['entries_done']}/{summary['entries_total']} entradas")
+            if summary['speed']:
+                text += f" · {summary['speed'] / (1024 * 1024):.1f} MB/s"
+            text += (f" · fin estimado {datetime.fromtimestamp(summary['finish_at']).strftime('%H:%M:%S')}"
+                     f" (quedan {self._format_eta(summary['eta'])})")
+            self.queue_summary_label.config(text=text)
+        else:
+            self.queue_summary_label.config(text="")
+        
+        # Si ya no queda nada en cola se restablecen los controles de descarga
+        if not self.downloader.is_downloading and str(self.cancel_btn['state']) == tk.NORMAL:
+            self._reset_download_buttons()
+        
+        self.root.after(1000, self._refresh_queue)
+    
+    def change_max_workers(self):
+        """Cambia el número de descargas simultáneas"""
+        try:
+            self.downloader.set_max_workers(int(self.max_workers_var.get()))
+        except (ValueError, tk.TclError):
+            pass
+    
+    def change_max_per_host(self):
+        """Cambia el número de descargas simultáneas contra un mismo sitio"""
+        try:
+            self.downloader.set_host_limit(int(self.max_per_host_var.get()))
+        except (ValueError, tk.TclError):
+            pass
+    
+    def change_worker_backend(self):
+        """Cambia entre hilos y procesos de trabajo"""
+        backend = "process" if self.worker_backend_var.get() == "Procesos" else "thread"
+        self.downloader.set_worker_backend(backend)
+    
+    def cancel_selected_job(self):
+        """Cancela el trabajo seleccionado en la cola"""
+        for job_id in self.queue_tree.selection():
+            self.downloader.cancel_download(job_id)
+    
+    def create_library_tab(self):
+        """Crea la pestaña de la biblioteca de descargas"""
+        library_tab_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(library_tab_frame, text="📚 Biblioteca")
+        
+        library_tab_frame.columnconfigure(0, weight=1)
+        library_tab_frame.rowconfigure(2, weight=1)
+        
+        ttk.Label(library_tab_frame, text="📚 Biblioteca de Descargas", style='Header.TLabel').grid(
+            row=0, column=0, sticky=tk.W, pady=(0, 10)
+        )
+        
+        # Búsqueda
+        search_frame = ttk.Frame(library_tab_frame)
+        search_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        search_frame.columnconfigure(0, weight=1)
+        
+        self.library_search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.library_search_var)
+        search_entry.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 5))
+        search_entry.bind('<Return>', lambda e: self.search_library())
+        ttk.Button(search_frame, text="🔍 Buscar", command=self.search_library).grid(row=0, column=1)
+        
+        # Resultados
+        columns = ("title", "uploader", "duration", "format", "size", "date", "path")
+        self.library_tree = ttk.Treeview(library_tab_frame, columns=columns, show="headings", height=12)
+        headings = {
+            "title": ("Título", 200),
+            "uploader": ("Canal", 100),
+            "duration": ("Duración", 60),
+            "format": ("Formato", 80),
+            "size": ("Tamaño", 70),
+            "date": ("Descargado", 110),
+            "path": ("Ruta", 160),
+        }
+        for column, (text, width) in headings.items():
+            self.library_tree.heading(column, text=text)
+            self.library_tree.column(column, width=width, stretch=(column in ("title", "path")))
+        self.library_tree.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.library_tree.bind('<Double-1>', lambda e: self.open_library_item())
+        
+        scrollbar = ttk.Scrollbar(library_tab_frame, orient=tk.VERTICAL, command=self.library_tree.yview)
+        scrollbar.grid(row=2, column=1, sticky=(tk.N, tk.S))
+        self.library_tree.configure(yscrollcommand=scrollbar.set)
+        
+        # Controles
+        library_buttons_frame = ttk.Frame(library_tab_frame)
+        library_buttons_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        self.library_count_label = ttk.Label(library_buttons_frame, text="")
+        self.library_count_label.pack(side=tk.LEFT)
+        
+        self.rescan_btn = ttk.Button(library_buttons_frame, text="🔄 Reexaminar carpeta",
+                                     command=self.rescan_library)
+        self.rescan_btn.pack(side=tk.RIGHT)
+        
+        self.search_library()
+    
+    def search_library(self):
+        """Busca en la biblioteca y muestra los resultados"""
+        rows = self.downloader.search_library(self.library_search_var.get(), limit=500)
+        
+        self.library_tree.delete(*self.library_tree.get_children())
+        for row in rows:
+            duration = ""
+            if row['duration']:
+                duration = f"{row['duration'] // 60}:{row['duration'] % 60:02d}"
+            size = f"{row['size'] / (1024 * 1024):.1f} MB" if row['size'] else ""
+            date = ""
+            if row['downloaded_at']:
+                date = datetime.fromtimestamp(row['downloaded_at']).strftime("%Y-%m-%d %H:%M")
+            self.library_tree.insert("", tk.END, iid=str(row['id']), values=(
+                row['title'] or "", row['uploader'] or "", duration, row['format'] or "",
+                size, date, row['path']
+            ))
+        
+        self.library_count_label.config(
+            text=f"{len(rows)} resultados de {self.downloader.catalog.count()} archivos"
+        )
+    
+    def open_library_item(self):
+        """Abre la carpeta del archivo seleccionado en la biblioteca"""
+        for iid in self.library_tree.selection():
+            path = self.library_tree.set(iid, "path")
+            if not self.downloader.open_folder(os.path.dirname(path)):
+                messagebox.showerror("Error", "No se pudo abrir la carpeta del archivo")
+    
+    def rescan_library(self):
+        """Reexamina la carpeta de descargas en segundo plano"""
+        self.rescan_btn.config(state=tk.DISABLED)
+        folder = self.download_path_var.get()
+        
+        def _rescan():
+            try:
+                self.downloader.rescan_library([folder])
+            except Exception as e:
+                self.log_message(f"❌ Error al reexaminar la biblioteca: {e}")
+            self.root.after(0, self._rescan_finished)
+        
+        threading.Thread(target=_rescan, daemon=True).start()
+    
+    def _rescan_finished(self):
+        """Restablece el botón y refresca los resultados tras reexaminar"""
+        self.rescan_btn.config(state=tk.NORMAL)
+        self.search_library()
     
     def create_url_section(self, parent):
         """Crea la sección de entrada de URL"""
@@ -231,16 +490,31 @@ class VideoDownloaderGUI:
         ttk.Radiobutton(type_frame, text="📹 Video o audio individual", 
                        variable=self.download_type_var, value="single").pack(side=tk.LEFT, padx=(0, 20))
         ttk.Radiobutton(type_frame, text="📋 Playlist completa", 
-                       variable=self.download_type_var, value="playlist").pack(side=tk.LEFT)
+                       variable=self.download_type_var, value="playlist").pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Radiobutton(type_frame, text="🔄 Sincronizar canal", 
+                       variable=self.download_type_var, value="sync").pack(side=tk.LEFT)
         
         # Calidad
         ttk.Label(config_frame, text="Calidad:").grid(row=1, column=0, sticky=tk.W, padx=(0, 10))
         
         self.quality_var = tk.StringVar(value="720p")
         self.quality_combo = ttk.Combobox(config_frame, textvariable=self.quality_var, state="readonly", width=20)
-        self.quality_combo['values'] = ("480p", "720p", "1080p", "Mejor disponible", "Audio únicamente")
+        self.quality_combo['values'] = ("480p", "720p", "1080p", "Mejor disponible", "Adaptativa", "Audio únicamente")
         self.quality_combo.grid(row=1, column=1, sticky=tk.W, pady=(0, 10))
         
+        # Prioridad en la cola (automática: alta para videos individuales)
+        priority_frame = ttk.Frame(config_frame)
+        priority_frame.grid(row=1, column=1, sticky=tk.E, pady=(0, 10))
+        # Tiempo objetivo por entrada de la calidad adaptativa
+        ttk.Label(priority_frame, text="Min/video:").pack(side=tk.LEFT, padx=(0, 5))
+        self.target_minutes_var = tk.StringVar(value="5")
+        ttk.Spinbox(priority_frame, from_=1, to=120, width=4,
+                    textvariable=self.target_minutes_var).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(priority_frame, text="Prioridad:").pack(side=tk.LEFT, padx=(0, 5))
+        self.priority_var = tk.StringVar(value="Automática")
+        ttk.Combobox(priority_frame, textvariable=self.priority_var, state="readonly", width=11,
+                     values=("Automática", "Alta", "Normal", "Baja")).pack(side=tk.LEFT)
+        
         # Carpeta de descarga
         ttk.Label(config_frame, text="Carpeta:").grid(row=2, column=0, sticky=tk.W, padx=(0, 10))
         
@@ -253,6 +527,65 @@ class VideoDownloaderGUI:
         
         ttk.Button(folder_frame, text="📁 Examinar", command=self.browse_folder).grid(row=0, column=1)
         ttk.Button(folder_frame, text="📂 Abrir", command=self.open_folder).grid(row=0, column=2, padx=(5, 0))
+        
+        # Filtros de playlist (se aplican al enumerar la playlist)
+        ttk.Label(config_frame, text="Filtros:").grid(row=3, column=0, sticky=(tk.W, tk.N), padx=(0, 10))
+        
+        filters_frame = ttk.Frame(config_frame)
+        filters_frame.grid(row=3, column=1, columnspan=2, sticky=tk.W)
+        
+        self.filter_items_var = tk.StringVar()
+        self.filter_min_duration_var = tk.StringVar()
+        self.filter_max_duration_var = tk.StringVar()
+        self.filter_date_after_var = tk.StringVar()
+        self.filter_date_before_var = tk.StringVar()
+        self.filter_title_var = tk.StringVar()
+        
+        items_row = ttk.Frame(filters_frame)
+        items_row.pack(anchor=tk.W)
+        ttk.Label(items_row, text="Elementos:").pack(side=tk.LEFT)
+        ttk.Entry(items_row, textvariable=self.filter_items_var, width=10).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(items_row, text="Duración mín/máx:").pack(side=tk.LEFT)
+        ttk.Entry(items_row, textvariable=self.filter_min_duration_var, width=7).pack(side=tk.LEFT, padx=(5, 2))
+        ttk.Entry(items_row, textvariable=self.filter_max_duration_var, width=7).pack(side=tk.LEFT)
+        
+        dates_row = ttk.Frame(filters_frame)
+        dates_row.pack(anchor=tk.W, pady=(5, 0))
+        ttk.Label(dates_row, text="Fechas (AAAAMMDD):").pack(side=tk.LEFT)
+        ttk.Entry(dates_row, textvariable=self.filter_date_after_var, width=10).pack(side=tk.LEFT, padx=(5, 2))
+        ttk.Entry(dates_row, textvariable=self.filter_date_before_var, width=10).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(dates_row, text="Título (regex):").pack(side=tk.LEFT)
+        ttk.Entry(dates_row, textvariable=self.filter_title_var, width=16).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Comprobación previa de espacio en disco
+        ttk.Label(config_frame, text="Espacio:").grid(row=4, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        
+        space_frame = ttk.Frame(config_frame)
+        space_frame.grid(row=4, column=1, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
+        # Desactivada por defecto: la estimación resuelve todas las entradas
+        # antes de empezar y retrasa la primera descarga
+        self.check_space_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(space_frame, text="💾 Estimar tamaño antes de descargar",
+                        variable=self.check_space_var).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(space_frame, text="Si no cabe:").pack(side=tk.LEFT)
+        self.space_policy_var = tk.StringVar(value="Recortar")
+        ttk.Combobox(space_frame, textvariable=self.space_policy_var, state="readonly", width=10,
+                     values=("Recortar", "Rechazar")).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Tramo a descargar de cada video (vacío: video completo)
+        ttk.Label(config_frame, text="Tramo:").grid(row=5, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        
+        clip_frame = ttk.Frame(config_frame)
+        clip_frame.grid(row=5, column=1, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
+        self.clip_start_var = tk.StringVar()
+        self.clip_end_var = tk.StringVar()
+        ttk.Label(clip_frame, text="Inicio:").pack(side=tk.LEFT)
+        ttk.Entry(clip_frame, textvariable=self.clip_start_var, width=9).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(clip_frame, text="Fin:").pack(side=tk.LEFT)
+        ttk.Entry(clip_frame, textvariable=self.clip_end_var, width=9).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(clip_frame, text="(h:mm:ss; vacío = video completo)").pack(side=tk.LEFT)
     
     def create_progress_section(self, parent):
         """Crea la sección de progreso"""
@@ -277,6 +610,16 @@ class VideoDownloaderGUI:
         # Información de progreso
         self.progress_info_label = ttk.Label(progress_frame, text="")
         self.progress_info_label.grid(row=2, column=0, sticky=tk.W)
+        
+        # Progreso agregado del trabajo (toda la playlist)
+        self.overall_bar = ttk.Progressbar(progress_frame, mode='determinate', length=400)
+        self.overall_bar.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(10, 5))
+        self.overall_info_label = ttk.Label(progress_frame, text="")
+        self.overall_info_label.grid(row=4, column=0, sticky=tk.W)
+        
+        # Progreso de toda la cola
+        self.queue_summary_label = ttk.Label(progress_frame, text="")
+        self.queue_summary_label.grid(row=5, column=0, sticky=tk.W)
     
     def create_bottom_buttons(self, parent):
         """Crea los botones inferiores"""
@@ -349,6 +692,7 @@ class VideoDownloaderGUI:
     
     def _update_info_display(self, info):
         """Actualiza la visualización de información"""
+        self._clear_thumbnails()
         self.info_text.config(state=tk.NORMAL)
         self.info_text.delete(1.0, tk.END)
         
@@ -361,7 +705,7 @@ class VideoDownloaderGUI:
         
         # Actualizar calidades disponibles
         if info['type'] == 'video' and info['formats']:
-            available_qualities = info['formats'] + ["Mejor disponible", "Audio únicamente"]
+            available_qualities = info['formats'] + ["Mejor disponible", "Adaptativa", "Audio únicamente"]
             self.quality_combo['values'] = available_qualities
             # Seleccionar una calidad por defecto que esté disponible
             if "720p" in available_qualities:
@@ -370,7 +714,7 @@ class VideoDownloaderGUI:
                 self.quality_var.set(available_qualities[0])
         else:
             # Para playlists o cuando no hay formatos específicos, usar valores por defecto
-            self.quality_combo['values'] = ("480p", "720p", "1080p", "Mejor disponible", "Audio únicamente")
+            self.quality_combo['values'] = ("480p", "720p", "1080p", "Mejor disponible", "Adaptativa", "Audio únicamente")
             self.quality_var.set("720p")
         
         # Habilitar descarga
@@ -381,6 +725,10 @@ class VideoDownloaderGUI:
         self.info_text.insert(tk.END, "📺 INFORMACIÓN DEL VIDEO\n", "header")
         self.info_text.insert(tk.END, "=" * 50 + "\n\n")
         
+        if info['thumbnail']:
+            self._add_thumbnail(info['thumbnail'], (240, 135))
+            self.info_text.insert(tk.END, "\n\n")
+        
         self.info_text.insert(tk.END, f"🎬 Título: ", "title")
         self.info_text.insert(tk.END, f"{info['title']}\n\n")
         
@@ -399,6 +747,10 @@ class VideoDownloaderGUI:
         self.info_text.insert(tk.END, f"👀 Visualizaciones: ", "title")
         self.info_text.insert(tk.END, f"{info['view_count']}\n\n")
         
+        if info['in_library']:
+            self.info_text.insert(tk.END, "📚 Ya en la biblioteca: ", "warning")
+            self.info_text.insert(tk.END, f"{info['in_library'][0]}\n\n")
+        
         if info['formats']:
             self.info_text.insert(tk.END, "🎥 Calidades disponibles:\n", "title")
             for quality in info['formats']:
@@ -409,6 +761,10 @@ class VideoDownloaderGUI:
         self.info_text.insert(tk.END, "📋 INFORMACIÓN DE LA PLAYLIST\n", "header")
         self.info_text.insert(tk.END, "=" * 50 + "\n\n")
         
+        if info['thumbnail']:
+            self._add_thumbnail(info['thumbnail'], (240, 135))
+            self.info_text.insert(tk.END, "\n\n")
+        
         self.info_text.insert(tk.END, f"📋 Título: ", "title")
         self.info_text.insert(tk.END, f"{info['title']}\n\n")
         
@@ -422,18 +778,55 @@ class VideoDownloaderGUI:
         
         for video in info['videos'][:15]:  # Mostrar primeros 15
             duration_str = ""
-            if video['duration']:
-                minutos = video['duration'] // 60
-                segundos = video['duration'] % 60
+            if video.duration:
+                minutos = video.duration // 60
+                segundos = video.duration % 60
                 duration_str = f" ({minutos}:{segundos:02d})"
             
-            self.info_text.insert(tk.END, f"   {video['index']:2d}. {video['title']}{duration_str}\n")
+            self.info_text.insert(tk.END, "   ")
+            if video.thumbnail:
+                self._add_thumbnail(video.thumbnail, (96, 54))
+            self.info_text.insert(tk.END, f"{video.index:2d}. {video.title}{duration_str}\n")
         
         if info['total_videos'] > 15:
             self.info_text.insert(tk.END, f"\n   ... y {info['total_videos'] - 15} videos más\n")
     
+    def _add_thumbnail(self, url, size):
+        """
+        Reserva el hueco de una miniatura en el panel de información y la
+        pide a la caché; se inserta cuando llega, sin bloquear la interfaz
+        """
+        mark = f"thumb{len(self.info_text.mark_names())}"
+        self.info_text.mark_set(mark, "end-1c")
+        self.info_text.mark_gravity(mark, tk.LEFT)
+        
+        generation = self._info_generation
+        self.downloader.thumbnails.request(
+            url, size, lambda image: self.root.after(0, self._insert_thumbnail, generation, mark, image)
+        )
+    
+    def _clear_thumbnails(self):
+        """Descarta las miniaturas del panel y las que aún estén en camino"""
+        self._info_generation += 1
+        self._thumbnail_photos = []
+        for mark in self.info_text.mark_names():
+            if mark.startswith("thumb"):
+                self.info_text.mark_unset(mark)
+    
+    def _insert_thumbnail(self, generation, mark, image):
+        """Inserta una miniatura ya reducida (en el hilo principal)"""
+        if image is None or generation != self._info_generation:
+            return
+        
+        photo = ImageTk.PhotoImage(image)
+        self._thumbnail_photos.append(photo)  # Tk no guarda referencia a la imagen
+        self.info_text.config(state=tk.NORMAL)
+        self.info_text.image_create(mark, image=photo, padx=2, pady=2)
+        self.info_text.config(state=tk.DISABLED)
+    
     def _show_analysis_error(self, error_msg):
         """Muestra error de análisis"""
+        self._clear_thumbnails()
         self.info_text.config(state=tk.NORMAL)
         self.info_text.delete(1.0, tk.END)
         self.info_text.insert(tk.END, "❌ ERROR AL ANALIZAR URL\n", "error")
@@ -464,33 +857,63 @@ class VideoDownloaderGUI:
             messagebox.showwarning("Advertencia", "Primero analiza la URL")
             return
         
-        # Configurar UI para descarga
-        self.download_btn.config(state=tk.DISABLED)
+        # Tiempo objetivo por video de la calidad adaptativa
+        target_time = None
+        if self.quality_var.get() == "Adaptativa":
+            try:
+                target_time = float(self.target_minutes_var.get()) * 60
+            except ValueError:
+                messagebox.showwarning("Advertencia", "El tiempo por video debe ser un número de minutos")
+                return
+        
+        # Configurar UI para descarga (se pueden seguir encolando descargas)
         self.cancel_btn.config(state=tk.NORMAL)
-        self.progress_bar['value'] = 0
-        self.status_label.config(text="Preparando descarga...")
+        if not self.downloader.is_downloading:
+            self.progress_bar['value'] = 0
+            self.status_label.config(text="Preparando descarga...")
         
         # Obtener configuración
         download_type = self.download_type_var.get()
         quality = self.quality_var.get()
         download_path = self.download_path_var.get()
+        playlist_filters = self._get_playlist_filters()
+        space_policy = "refuse" if self.space_policy_var.get() == "Rechazar" else "trim"
+        priority = {"Alta": "high", "Normal": "normal", "Baja": "low"}.get(self.priority_var.get())
         
-        # Iniciar descarga
-        success = self.downloader.start_download(
+        # Encolar descarga
+        job_id = self.downloader.start_download(
             url=url,
             download_type=download_type,
             quality=quality,
-            download_path=download_path
+            download_path=download_path,
+            playlist_filters=playlist_filters,
+            check_space=self.check_space_var.get(),
+            space_policy=space_policy,
+            priority=priority,
+            target_time=target_time,
+            start_time=self.clip_start_var.get().strip() or None,
+            end_time=self.clip_end_var.get().strip() or None
         )
         
-        if not success:
-            self._reset_download_buttons()
+        if not job_id:
+            if not self.downloader.is_downloading:
+                self._reset_download_buttons()
             messagebox.showerror("Error", "No se pudo iniciar la descarga")
     
+    def _get_playlist_filters(self):
+        """Obtiene los filtros de playlist introducidos en la configuración"""
+        return {
+            'items': self.filter_items_var.get().strip(),
+            'min_duration': self.filter_min_duration_var.get().strip(),
+            'max_duration': self.filter_max_duration_var.get().strip(),
+            'date_after': self.filter_date_after_var.get().strip(),
+            'date_before': self.filter_date_before_var.get().strip(),
+            'title_regex': self.filter_title_var.get().strip(),
+        }
+    
     def cancel_download(self):
-        """Cancela la descarga actual"""
+        """Cancela todas las descargas en cola y en curso"""
         self.downloader.cancel_download()
-        self._reset_download_buttons()
     
     def _reset_download_buttons(self):
         """Restablece los botones de descarga"""
@@ -499,6 +922,8 @@ class VideoDownloaderGUI:
         self.status_label.config(text="Listo para descargar")
         self.progress_bar['value'] = 0
         self.progress_info_label.config(text="")
+        self.overall_bar['value'] = 0
+        self.overall_info_label.config(text="")
     
     def on_progress_update(self, status, data):
         """Callback para actualizaciones de progreso"""
@@ -518,22 +943,71 @@ class VideoDownloaderGUI:
                 self.progress_info_label.config(text=f"⬇️ {data['filename']} - {data['downloaded_mb']:.1f} MB")
             
             self.status_label.config(text="Descargando...")
+            self._show_overall_progress(data['overall'])
             
         elif status == "file_completed":
             self.progress_bar['value'] = 100
+            self._show_overall_progress(data['overall'])
+            
+        elif status == "report":
+            self.download_reports[data['job_id']] = data
             
         elif status == "completed":
             self.status_label.config(text="✅ Descarga completada")
             self.progress_bar['value'] = 100
             self.progress_info_label.config(text="")
-            messagebox.showinfo("Éxito", "¡Descarga completada exitosamente!")
+            report = self.download_reports.pop(data['job_id'], None)
+            if report and report['failed']:
+                messagebox.showwarning(
+                    "Descarga completada con errores",
+                    f"Se descargaron {report['succeeded']} videos, pero {len(report['failed'])} "
+                    f"fallaron tras varios reintentos.\nConsulta el Registro para ver el detalle."
+                )
+            else:
+                messagebox.showinfo("Éxito", "¡Descarga completada exitosamente!")
+            
+        elif status == "incomplete":
+            self.status_label.config(text="⚠️ Descarga incompleta")
+            self.progress_info_label.config(text="")
+            report = self.download_reports.pop(data['job_id'], None)
+            messagebox.showwarning(
+                "Descarga incompleta",
+                f"Se descargaron {report['succeeded'] if report else 0} videos, pero se dejaron de "
+                f"admitir entradas por falta de espacio en disco.\nConsulta el Registro para ver el detalle."
+            )
             
         elif status == "error":
             self.status_label.config(text="❌ Error en la descarga")
             messagebox.showerror("Error", f"Error durante la descarga:\n{data}")
             
         elif status == "finished":
-            self._reset_download_buttons()
+            if not self.downloader.is_downloading:
+                self._reset_download_buttons()
+    
+    def _show_overall_progress(self, overall):
+        """Muestra el progreso agregado del trabajo en curso"""
+        if overall['percent'] is not None:
+            self.overall_bar['value'] = overall['percent']
+        
+        parts = [f"📦 {overall['entries_done']}/{overall['entries_total']} entradas"]
+        if overall['bytes_total']:
+            parts.append(f"{overall['bytes_done'] / (1024 * 1024):.1f}/"
+                         f"{overall['bytes_total'] / (1024 * 1024):.1f} MB")
+        if overall['speed']:
+            parts.append(f"{overall['speed'] / (1024 * 1024):.1f} MB/s")
+        if overall['eta'] is not None:
+            parts.append(f"quedan {self._format_eta(overall['eta'])}")
+        self.overall_info_label.config(text=" · ".join(parts))
+    
+    @staticmethod
+    def _format_eta(seconds):
+        """Formatea un tiempo restante de forma legible"""
+        seconds = int(seconds)
+        if seconds < 60:
+            return f"{seconds}s"
+        if seconds < 3600:
+            return f"{seconds // 60}m {seconds % 60:02d}s"
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
     
     def log_message(self, message):
         """Callback para mensajes de log"""
@@ -602,13 +1076,17 @@ class VideoDownloaderGUI:
         """Limpia la URL y la información"""
         self.url_entry.delete(0, tk.END)
         self.current_info = None
+        self._clear_thumbnails()
         self.info_text.config(state=tk.NORMAL)
         self.info_text.delete(1.0, tk.END)
         self.info_text.config(state=tk.DISABLED)
         self.download_btn.config(state=tk.DISABLED)
         # Restablecer calidades por defecto
-        self.quality_combo['values'] = ("480p", "720p", "1080p", "Mejor disponible", "Audio únicamente")
+        self.quality_combo['values'] = ("480p", "720p", "1080p", "Mejor disponible", "Adaptativa", "Audio únicamente")
         self.quality_var.set("720p")
+        # El tramo es propio de cada video
+        self.clip_start_var.set("")
+        self.clip_end_var.set("")
     
     def browse_folder(self):
         """Abre el diálogo para seleccionar carpeta"""
@@ -626,6 +1104,54 @@ class VideoDownloaderGUI:
         if not success:
             messagebox.showerror("Error", "No se pudo abrir la carpeta de descargas")
     
+    def open_log_folder(self):
+        """Abre la carpeta del registro de actividad en disco"""
+        if not self.downloader.open_log_folder():
+            messagebox.showerror("Error", "No se pudo abrir la carpeta de registros")
+    
+    def toggle_profiling(self):
+        """Activa o desactiva el perfilado"""
+        self.downloader.set_profiling(self.profiling_var.get())
+    
+    def show_profile_reports(self):
+        """Muestra los informes de perfilado en una ventana"""
+        reports = self.downloader.list_profile_reports()
+        if not reports:
+            messagebox.showinfo("Perfiles", "Aún no hay informes de perfilado.\n"
+                                "Activa \"Perfilar\" y analiza o descarga algo.")
+            return
+        
+        profile_window = tk.Toplevel(self.root)
+        profile_window.title("📈 Informes de perfilado")
+        profile_window.geometry("900x600")
+        profile_window.columnconfigure(1, weight=1)
+        profile_window.rowconfigure(0, weight=1)
+        
+        reports_list = tk.Listbox(profile_window, width=32)
+        reports_list.grid(row=0, column=0, sticky=(tk.N, tk.S), padx=(10, 5), pady=10)
+        for report in reports:
+            reports_list.insert(tk.END, report.stem)
+        
+        report_text = scrolledtext.ScrolledText(profile_window, wrap=tk.NONE, font=('Consolas', 9))
+        report_text.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 10), pady=10)
+        
+        def _show_selected(event=None):
+            selection = reports_list.curselection()
+            if not selection:
+                return
+            report_text.config(state=tk.NORMAL)
+            report_text.delete(1.0, tk.END)
+            try:
+                with open(reports[selection[0]], 'r', encoding='utf-8') as f:
+                    report_text.insert(tk.END, f.read())
+            except OSError as e:
+                report_text.insert(tk.END, f"❌ No se pudo leer el informe: {e}")
+            report_text.config(state=tk.DISABLED)
+        
+        reports_list.bind('<<ListboxSelect>>', _show_selected)
+        reports_list.selection_set(0)
+        _show_selected()
+    
     def show_help(self):
         """Muestra la ayuda"""
         help_text = """
@@ -642,10 +1168,13 @@ CÓMO USAR:
 PESTAÑAS:
 • Descargador: Funcionalidad principal para descargar videos
 • Registro: Historial detallado de todas las actividades y errores
+• Cola: Descargas pendientes con su posición e inicio estimado
 
 TIPOS DE DESCARGA:
 • Video individual: Descarga solo el video de la URL
 • Playlist completa: Descarga todos los videos de la playlist
+• Sincronizar canal: Descarga solo los videos nuevos desde la
+  última sincronización de ese canal o playlist
 
 CALIDADES DISPONIBLES:
 • 480p, 720p, 1080p: Resoluciones específicas
@@ -709,8 +1238,10 @@ DESARROLLADO CON ❤️ POR:
             if messagebox.askokcancel("Cerrar aplicación", 
                                     "Hay una descarga en progreso. ¿Deseas cancelarla y cerrar la aplicación?"):
                 self.downloader.cancel_download()
+                self.downloader.close()
                 self.root.destroy()
         else:
+            self.downloader.close()
             self.root.destroy()
 
 def main():
@@ -1,306 +1,3918 @@
 import yt_dlp
+from yt_dlp.downloader import HttpFD, get_suitable_downloader
+from yt_dlp.utils.networking import HTTPHeaderDict
 import threading
+import collections
+import copy
+import cProfile
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import multiprocessing
 import os
+import pstats
+import queue
+import random
+import re
+import shutil
+import sqlite3
 import sys
+import time
+import tracemalloc
 from pathlib import Path
 from datetime import datetime
-from typing import Callable, Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Iterator, List, Tuple
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
 
-class VideoDownloader:
+def pick_thumbnail(info: Dict, min_width: int = 320) -> Optional[str]:
     """
-    Clase que maneja toda la lógica de descarga de videos y playlists
+    Elige la URL de la miniatura más pequeña que tenga al menos min_width
+    de ancho (descargar la de máxima resolución para reducirla no compensa)
+    """
+    thumbnails = [thumb for thumb in info.get('thumbnails') or [] if thumb.get('url')]
+    sized = sorted((thumb for thumb in thumbnails if thumb.get('width')), key=lambda thumb: thumb['width'])
+    for thumb in sized:
+        if thumb['width'] >= min_width:
+            return thumb['url']
+    if info.get('thumbnail'):
+        return info['thumbnail']
+    return thumbnails[-1]['url'] if thumbnails else None
+
+
+class PlaylistEntry:
     """
+    Entrada compacta de una playlist
     
-    def __init__(self, progress_callback: Optional[Callable] = None, 
-                 log_callback: Optional[Callable] = None):
+    Usa __slots__ para no reservar un diccionario por entrada: en playlists
+    de decenas de miles de videos la diferencia es de varios MB.
+    """
+    __slots__ = ('index', 'id', 'title', 'duration', 'url', 'thumbnail')
+    
+    def __init__(self, index: int, id: Optional[str], title: str, duration: int, url: Optional[str],
+                 thumbnail: Optional[str] = None):
+        self.index = index
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.url = url
+        self.thumbnail = thumbnail
+    
+    @classmethod
+    def from_playlist(cls, info: Dict) -> List['PlaylistEntry']:
         """
-        Constructor del descargador
+        Convierte las entradas de una playlist de yt-dlp en registros compactos
         
+        Las entradas se extraen del diccionario (se quitan de info) para que
+        la información cruda se pueda liberar mientras se recorre.
+        """
+        entries = info.pop('entries', None) or []
+        videos = []
+        for i, entry in enumerate(entries, 1):
+            if entry:
+                videos.append(cls(
+                    index=i,
+                    id=entry.get('id'),
+                    title=entry.get('title') or f'Video {i}',
+                    duration=int(entry.get('duration') or 0),
+                    url=entry.get('url') or entry.get('webpage_url'),
+                    thumbnail=pick_thumbnail(entry)
+                ))
+        return videos
+    
+    def __repr__(self):
+        return f"PlaylistEntry({self.index}, {self.title!r})"
+
+
+# Prioridades de la cola de descargas (menor valor = se atiende antes)
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+# Fragmentos de mensajes de error que no se arreglan reintentando
+PERMANENT_ERRORS = (
+    'private video',
+    'video unavailable',
+    'this video is not available',
+    'has been removed',
+    'unsupported url',
+    'members-only',
+    'requested format is not available',
+    'sign in to confirm your age',
+    'not available in your country',
+)
+
+
+def host_key(url: Optional[str]) -> str:
+    """
+    Obtiene el host de origen de una URL (sin www. ni m.)
+    
+    Es la clave con la que la cola limita las descargas por sitio y el
+    cortocircuito cuenta los fallos.
+    """
+    host = (urlparse(url or '').hostname or 'desconocido').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if host == 'youtu.be' or host.endswith('.youtube.com'):
+        host = 'youtube.com'
+    return host
+
+
+class JobProgress:
+    """
+    Progreso agregado de un trabajo
+    
+    Acumula los bytes de las entradas terminadas y de los archivos en curso,
+    mantiene una media móvil del caudal y extrapola el tamaño total a partir
+    del tamaño medio de las entradas ya descargadas (o de la estimación
+    previa, si se calculó), para dar un tiempo restante del trabajo entero.
+    """
+    
+    def __init__(self, smoothing: float = 0.3, sample_interval: float = 1.0):
+        """
         Args:
-            progress_callback: Función que se llama durante el progreso de descarga
-            log_callback: Función que se llama para registrar mensajes
+            smoothing: Peso de cada nueva muestra en la media móvil del caudal
+            sample_interval: Segundos mínimos entre muestras del caudal
         """
-        self.progress_callback = progress_callback
-        self.log_callback = log_callback
-        self.is_downloading = False
-        self.download_thread = None
-        self.current_download_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        self.smoothing = smoothing
+        self.sample_interval = sample_interval
+        self.entries_total = 1
+        self.entries_done = 0
+        self.entries_failed = 0
+        self.bytes_done = 0  # Bytes de entradas terminadas
+        self.size_hint = None  # Tamaño total estimado antes de empezar
+        self.speed = None  # Bytes por segundo (media móvil)
+        self.remote = None  # Último resumen recibido del proceso de trabajo, si lo hay
         
-        # Crear carpeta de descargas por defecto
-        Path(self.current_download_path).mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._files = {}  # Archivo de la entrada en curso -> [descargados, total]
+        self._entries_with_bytes = 0
+        self._transferred = 0
+        self._sample = None  # (momento, bytes transferidos) de la última muestra
+    
+    def set_entries(self, total: int):
+        with self._lock:
+            self.entries_total = max(total, 1)
+    
+    def update_file(self, filename: str, downloaded: int, total: Optional[int], downloading: bool = True):
+        """
+        Registra el avance de un archivo de la entrada en curso
+        
+        Args:
+            downloading: False para archivos que ya existían, que no cuentan
+                para el caudal
+        """
+        now = time.time()
+        with self._lock:
+            previous = self._files.get(filename, [0, None])
+            if downloading and downloaded > previous[0]:
+                self._transferred += downloaded - previous[0]
+            self._files[filename] = [downloaded, total or previous[1]]
+            
+            if not downloading:
+                return
+            if self._sample is None:
+                self._sample = (now, self._transferred)
+            elif now - self._sample[0] >= self.sample_interval:
+                rate = (self._transferred - self._sample[1]) / (now - self._sample[0])
+                self.speed = rate if self.speed is None else (
+                    self.smoothing * rate + (1 - self.smoothing) * self.speed)
+                self._sample = (now, self._transferred)
+    
+    def finish_entry(self, succeeded: bool, counted: bool = True):
+        """
+        Cierra la entrada en curso
+        
+        Args:
+            succeeded: Si la entrada se descargó
+            counted: False en los reintentos de la pasada final, cuya entrada
+                ya se contó como terminada
+        """
+        with self._lock:
+            entry_bytes = sum(max(downloaded, total or 0) for downloaded, total in self._files.values())
+            self._files = {}
+            if succeeded and entry_bytes:
+                self.bytes_done += entry_bytes
+                self._entries_with_bytes += 1
+            if counted:
+                self.entries_done += 1
+                if not succeeded:
+                    self.entries_failed += 1
+            elif succeeded:
+                self.entries_failed = max(self.entries_failed - 1, 0)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Devuelve el progreso agregado
+        
+        Returns:
+            Dict con 'entries_done', 'entries_total', 'entries_failed',
+            'bytes_done', 'bytes_total' (estimado, None si aún no se puede
+            estimar), 'percent', 'speed' (bytes/s) y 'eta' (segundos)
+        """
+        if self.remote is not None:
+            return dict(self.remote)
+        with self._lock:
+            current_done = sum(downloaded for downloaded, _ in self._files.values())
+            current_total = sum(max(downloaded, total or 0) for downloaded, total in self._files.values())
+            bytes_done = self.bytes_done + current_done
+            remaining_entries = max(self.entries_total - self.entries_done - (1 if self._files else 0), 0)
+            
+            bytes_total = None
+            if self._entries_with_bytes:
+                average = self.bytes_done / self._entries_with_bytes
+                bytes_total = self.bytes_done + current_total + remaining_entries * average
+            elif current_total and remaining_entries == 0:
+                bytes_total = current_total
+            elif current_total:
+                # Sin entradas terminadas se toma la actual como referencia
+                bytes_total = current_total * (remaining_entries + 1)
+            if self.size_hint and (bytes_total is None or self.entries_done == 0):
+                bytes_total = max(self.size_hint, bytes_done)
+            
+            percent = None
+            eta = None
+            if bytes_total:
+                percent = min(bytes_done / bytes_total * 100, 100.0)
+                if self.speed:
+                    eta = max(bytes_total - bytes_done, 0) / self.speed
+            elif self.entries_total > 1:
+                percent = self.entries_done / self.entries_total * 100
+            
+            return {
+                'entries_done': self.entries_done,
+                'entries_total': self.entries_total,
+                'entries_failed': self.entries_failed,
+                'bytes_done': bytes_done,
+                'bytes_total': bytes_total,
+                'percent': percent,
+                'speed': self.speed,
+                'eta': eta
+            }
+
+
+class AdaptiveQuality:
+    """
+    Selector de formato de yt-dlp para la calidad adaptativa
+    
+    Para cada entrada elige el mejor formato (video y audio en un solo
+    archivo, como el resto de calidades) cuyo tamaño se pueda descargar en
+    el tiempo objetivo al caudal medido en las entradas anteriores. El
+    caudal se mide sobre lo que realmente llega del servidor, no sobre la
+    calidad elegida, así que si la conexión mejora la siguiente entrada
+    vuelve a subir de calidad.
+    """
+    
+    def __init__(self, target_seconds: float = 300.0, initial_height: int = 720,
+                 headroom: float = 0.8, smoothing: float = 0.5, sample_interval: float = 1.0,
+                 clip_seconds: Optional[float] = None):
+        """
+        Args:
+            target_seconds: Tiempo de descarga objetivo por entrada
+            initial_height: Altura máxima mientras no haya caudal medido
+            headroom: Fracción del presupuesto que se usa (margen ante bajadas)
+            smoothing: Peso de cada nueva muestra en la media móvil del caudal
+            sample_interval: Segundos mínimos entre muestras del caudal
+            clip_seconds: Duración del tramo si solo se descarga una parte;
+                el tamaño de cada formato se calcula entonces con su bitrate
+        """
+        self.target_seconds = target_seconds
+        self.initial_height = initial_height
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.sample_interval = sample_interval
+        self.clip_seconds = clip_seconds
+        self.duration = None  # Duración de la entrada que se está resolviendo
+        self.speed = None  # Bytes por segundo (media móvil)
+        self.choice = None  # Última elección: 'label', 'size' y 'speed'
+        self.reported = None  # Etiqueta de la última elección registrada
+        self._last_sample = 0.0
+    
+    def observe(self, d: Dict):
+        """
+        Toma una muestra del caudal a partir de un evento del hook de progreso
+        """
+        if d['status'] == 'downloading' and d.get('speed'):
+            now = time.time()
+            if now - self._last_sample >= self.sample_interval:
+                self._add_sample(d['speed'])
+                self._last_sample = now
+        elif d['status'] == 'finished' and d.get('elapsed'):
+            # Los archivos muy cortos no llegan a dar muestras intermedias
+            size = d.get('total_bytes') or d.get('downloaded_bytes')
+            if size and d['elapsed'] >= 0.5:
+                self._add_sample(size / d['elapsed'])
+    
+    def _add_sample(self, rate: float):
+        self.speed = rate if self.speed is None else (
+            self.smoothing * rate + (1 - self.smoothing) * self.speed)
+    
+    def __call__(self, ctx: Dict):
+        # yt-dlp entrega los formatos ordenados de peor a mejor
+        formats = [f for f in ctx['formats'] if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
+        if not formats and ctx.get('incomplete_formats'):
+            formats = [f for f in ctx['formats'] if f.get('vcodec') != 'none' or f.get('acodec') != 'none']
+        if not formats:
+            return
+        
+        sizes = [self._format_size(f) for f in formats]
+        if self.speed is None:
+            capped = [f for f in formats if (f.get('height') or 0) <= self.initial_height]
+            chosen = capped[-1] if capped else formats[0]
+        else:
+            budget = self.speed * self.target_seconds * self.headroom
+            fitting = [f for f, size in zip(formats, sizes) if size and size <= budget]
+            known = [(size, i) for i, size in enumerate(sizes) if size]
+            if fitting:
+                chosen = fitting[-1]
+            elif known:
+                # Ninguno cabe: el más pequeño
+                chosen = formats[min(known)[1]]
+            else:
+                chosen = formats[0]
+        
+        self.choice = {
+            'label': f"{chosen['height']}p" if chosen.get('height') else (chosen.get('format_note') or chosen.get('format_id')),
+            'size': self._format_size(chosen),
+            'speed': self.speed
+        }
+        yield chosen
+    
+    def _format_size(self, fmt: Dict) -> Optional[float]:
+        # tbr está en kbit/s
+        if self.clip_seconds and fmt.get('tbr'):
+            return fmt['tbr'] * 1000 / 8 * self.clip_seconds
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and fmt.get('tbr') and self.duration:
+            # Sin tamaño declarado (HLS y muchos extractores): bitrate por duración
+            size = fmt['tbr'] * 1000 / 8 * self.duration
+        return size
+
+
+class DownloadJob:
+    """
+    Trabajo de descarga en la cola del planificador
+    """
+    
+    def __init__(self, job_id: str, url: str, download_type: str, quality: str,
+                 download_path: str, priority: str = "normal",
+                 playlist_filters: Optional[Dict[str, Any]] = None,
+                 check_space: bool = False, space_policy: str = "trim",
+                 target_time: Optional[float] = None,
+                 clip: Optional[Tuple[int, Optional[int]]] = None):
+        self.job_id = job_id
+        self.url = url
+        self.download_type = download_type
+        self.quality = quality
+        self.download_path = download_path
+        self.priority = priority
+        self.playlist_filters = playlist_filters
+        self.check_space = check_space
+        self.space_policy = space_policy
+        self.target_time = target_time
+        self.clip = clip  # (inicio, fin) en segundos si solo se descarga un tramo
+        self.adaptive = None  # AdaptiveQuality si la calidad es "Adaptativa"
+        
+        # Estado: queued, running, paused, completed, error, cancelled
+        self.status = "queued"
+        self.cancelled = False
+        self.cancel_event = threading.Event()
+        self.space_exhausted = False
+        self.enumerating = False  # La playlist se sigue listando mientras se descarga
+        self.enumeration_interrupted = False  # El listado se cortó con un error
+        self.report = None
+        self.profile_report = None
+        self.progress = JobProgress()
+        self.host = host_key(url)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        
+        # Orden de llegada, para desempatar trabajos con la misma prioridad
+        self.seq = 0
+        self._resume = threading.Event()
+    
+    @property
+    def priority_value(self) -> int:
+        return PRIORITIES.get(self.priority, PRIORITIES['normal'])
+    
+    def __lt__(self, other: 'DownloadJob') -> bool:
+        return (self.priority_value, self.seq) < (other.priority_value, other.seq)
+
+
+class DownloadScheduler:
+    """
+    Planificador de la cola de descargas
+    
+    Ejecuta como máximo max_workers trabajos a la vez, siempre el de mayor
+    prioridad primero, y además no más de max_per_host trabajos contra un
+    mismo sitio. Los trabajos largos llaman a yield_slot entre entradas
+    para ceder su hueco si espera un trabajo más prioritario.
+    """
+    
+    def __init__(self, runner: Callable[[DownloadJob], None], max_workers: int = 2,
+                 max_per_host: int = 2):
+        """
+        Args:
+            runner: Función que ejecuta un trabajo (en su propio hilo)
+            max_workers: Número máximo de trabajos simultáneos
+            max_per_host: Número máximo de trabajos simultáneos por sitio
+        """
+        self._runner = runner
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+        self.host_limits = {}  # Límites específicos por sitio
+        self._cond = threading.Condition()
+        self._pending = []  # Montículo de DownloadJob
+        self._running = set()
+        self._jobs = {}
+        self._seq = 0
+        
+        # Duración media observada por tipo de trabajo (segundos), para estimar inicios
+        self._avg_seconds = {'single': 60.0, 'playlist': 900.0, 'sync': 300.0}
+    
+    def submit(self, job: DownloadJob):
+        """
+        Encola un trabajo
+        """
+        with self._cond:
+            self._seq += 1
+            job.seq = self._seq
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._pending, job)
+            self._dispatch()
+    
+    def track(self, job: DownloadJob):
+        """
+        Registra un trabajo que se ejecuta fuera de la cola (p.ej. un envío
+        directo a un consumidor) para que aparezca en get_jobs y se pueda
+        cancelar; no ocupa hueco ni cuenta en el resumen de la cola
+        """
+        with self._cond:
+            self._seq += 1
+            job.seq = self._seq
+            self._jobs[job.job_id] = job
+    
+    def set_max_workers(self, max_workers: int):
+        """
+        Cambia el número de trabajos simultáneos
+        """
+        with self._cond:
+            self.max_workers = max(1, max_workers)
+            self._dispatch()
+    
+    def set_host_limit(self, host: Optional[str], limit: int):
+        """
+        Cambia el límite de trabajos simultáneos de un sitio (o el general si host es None)
+        """
+        with self._cond:
+            if host is None:
+                self.max_per_host = max(1, limit)
+            else:
+                self.host_limits[host] = max(1, limit)
+            self._dispatch()
+    
+    def _host_limit(self, host: str) -> int:
+        return self.host_limits.get(host, self.max_per_host)
+    
+    def _host_load(self, host: str) -> int:
+        return sum(1 for job in self._running if job.host == host)
+    
+    def _can_admit(self, job: DownloadJob, releasing: Optional[DownloadJob] = None) -> bool:
+        """
+        Indica si el límite de su sitio permite arrancar el trabajo
+        
+        Args:
+            releasing: Trabajo en ejecución que liberaría su hueco
+        """
+        load = self._host_load(job.host)
+        if releasing is not None and releasing.host == job.host:
+            load -= 1
+        return load < self._host_limit(job.host)
+    
+    def _dispatch(self):
+        """
+        Arranca o reanuda trabajos mientras haya huecos libres (con el lock tomado)
+        
+        Se recorre la cola por prioridad saltando los trabajos cuyo sitio ya
+        está en su límite, que esperan sin bloquear a los de otros sitios.
+        """
+        if not self._pending or len(self._running) >= self.max_workers:
+            return
+        
+        waiting = []
+        for job in sorted(self._pending):
+            if job.cancelled and job.started_at is None:
+                job.status = "cancelled"
+                continue
+            if len(self._running) >= self.max_workers or not self._can_admit(job):
+                waiting.append(job)
+                continue
+            
+            self._running.add(job)
+            job.status = "running"
+            if job.started_at is None:
+                job.started_at = time.time()
+                threading.Thread(target=self._run, args=(job,), daemon=True).start()
+            else:
+                # Trabajo que había cedido su hueco
+                job._resume.set()
+        
+        self._pending = waiting
+        heapq.heapify(self._pending)
+    
+    def _run(self, job: DownloadJob):
+        """
+        Hilo de un trabajo: lo ejecuta y libera su hueco al terminar
+        """
+        try:
+            self._runner(job)
+        finally:
+            with self._cond:
+                self._running.discard(job)
+                job.finished_at = time.time()
+                if job.status in ("running", "paused"):
+                    job.status = "cancelled" if job.cancelled else "completed"
+                if job.status == "completed":
+                    elapsed = job.finished_at - job.started_at
+                    previous = self._avg_seconds.get(job.download_type, elapsed)
+                    self._avg_seconds[job.download_type] = 0.7 * previous + 0.3 * elapsed
+                self._dispatch()
+                self._cond.notify_all()
+    
+    def yield_slot(self, job: DownloadJob):
+        """
+        Cede el hueco del trabajo si hay otro más prioritario esperando
+        
+        Se llama entre entradas de una playlist. Bloquea hasta que el
+        planificador vuelve a dar un hueco al trabajo.
+        """
+        with self._cond:
+            if job.cancelled:
+                return
+            # Solo se cede ante un trabajo más prioritario que pueda arrancar en el hueco
+            if not any(other.priority_value < job.priority_value and self._can_admit(other, releasing=job)
+                       for other in self._pending):
+                return
+            
+            self._running.discard(job)
+            job.status = "paused"
+            job._resume.clear()
+            heapq.heappush(self._pending, job)
+            self._dispatch()
+        
+        job._resume.wait()
+    
+    def cancel(self, job_id: Optional[str] = None) -> int:
+        """
+        Cancela un trabajo o, sin job_id, todos los activos
+        
+        Returns:
+            Número de trabajos cancelados
+        """
+        with self._cond:
+            if job_id is not None:
+                targets = [self._jobs[job_id]] if job_id in self._jobs else []
+            else:
+                targets = list(self._jobs.values())
+            
+            cancelled = 0
+            for job in targets:
+                if job.status not in ("queued", "running", "paused"):
+                    continue
+                job.cancelled = True
+                job.cancel_event.set()
+                cancelled += 1
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    job.finished_at = time.time()
+                elif job.status == "paused":
+                    # Se despierta para que termine por su cuenta
+                    self._pending.remove(job)
+                    heapq.heapify(self._pending)
+                    self._running.add(job)
+                    job._resume.set()
+            
+            self._pending = [job for job in self._pending if not job.cancelled]
+            heapq.heapify(self._pending)
+            self._dispatch()
+            return cancelled
+    
+    def has_active_jobs(self) -> bool:
+        """
+        Indica si hay trabajos en cola o en ejecución
+        """
+        with self._cond:
+            return bool(self._pending or self._running)
+    
+    def get_job(self, job_id: str) -> Optional[DownloadJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+    
+    def _estimate_remaining(self, job: DownloadJob, now: float) -> float:
+        """
+        Segundos que se espera que tarde aún un trabajo
+        """
+        expected = self._avg_seconds.get(job.download_type, 60.0)
+        if job.started_at is None:
+            return expected
+        # Con caudal medido se usa el tiempo restante del propio trabajo
+        eta = job.progress.snapshot()['eta']
+        if eta is not None:
+            return max(eta, 1.0)
+        return max(expected - (now - job.started_at), 5.0)
+    
+    def _simulate_queue(self, now: float):
+        """
+        Simula el reparto de huecos con la duración estimada de cada trabajo
+        (con el lock tomado)
+        
+        Returns:
+            Tupla (posición e inicio estimado por job_id, fin estimado de la cola)
+        """
+        # Momento en que se espera que quede libre cada hueco
+        slots = [now + self._estimate_remaining(job, now) for job in self._running]
+        finish = max(slots, default=now)
+        slots += [now] * max(self.max_workers - len(slots), 0)
+        heapq.heapify(slots)
+        
+        # Lo mismo para los huecos de cada sitio
+        host_slots = {}
+        for job in self._running:
+            host_slots.setdefault(job.host, []).append(now + self._estimate_remaining(job, now))
+        
+        queue_info = {}
+        for position, job in enumerate(sorted(self._pending), 1):
+            own = host_slots.setdefault(job.host, [])
+            own += [now] * max(self._host_limit(job.host) - len(own), 0)
+            heapq.heapify(own)
+            
+            start = max(heapq.heappop(slots), heapq.heappop(own))
+            queue_info[job.job_id] = (position, start)
+            end = start + self._estimate_remaining(job, now)
+            heapq.heappush(slots, end)
+            heapq.heappush(own, end)
+            finish = max(finish, end)
+        
+        return queue_info, finish
+    
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Obtiene el estado de todos los trabajos
+        
+        Los trabajos en cola incluyen su posición y una hora estimada de
+        inicio, simulando el reparto de huecos con el tiempo restante de los
+        trabajos en curso y la duración media observada de cada tipo.
+        
+        Returns:
+            Lista de diccionarios, en orden de llegada
+        """
+        with self._cond:
+            queue_info, _ = self._simulate_queue(time.time())
+            
+            jobs = []
+            for job in self._jobs.values():
+                position, expected_start = queue_info.get(job.job_id, (None, None))
+                jobs.append({
+                    'job_id': job.job_id,
+                    'url': job.url,
+                    'download_type': job.download_type,
+                    'quality': job.quality,
+                    'host': job.host,
+                    'priority': job.priority,
+                    'status': job.status,
+                    'position': position,
+                    'expected_start': expected_start,
+                    'created_at': job.created_at,
+                    'started_at': job.started_at,
+                    'finished_at': job.finished_at,
+                    'progress': job.progress.snapshot()
+                })
+            return jobs
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        Obtiene el progreso agregado de la cola (trabajos pendientes y en curso)
+        
+        Returns:
+            Dict con 'jobs_active', 'jobs_queued', 'entries_done',
+            'entries_total' (sin contar playlists no empezadas), 'bytes_done', 'bytes_total' (suma de los trabajos
+            con tamaño estimado), 'speed' (suma de caudales), 'eta' (segundos
+            hasta que termine toda la cola) y 'finish_at'
+        """
+        with self._cond:
+            now = time.time()
+            _, finish = self._simulate_queue(now)
+            active = list(self._running) + list(self._pending)
+            snapshots = [job.progress.snapshot() for job in active]
+            # Las playlists que no han empezado aún no saben cuántas entradas tienen
+            counted = [snap for job, snap in zip(active, snapshots)
+                       if job.started_at is not None or job.download_type == "single"]
+            
+            return {
+                'jobs_active': len(self._running),
+                'jobs_queued': len(self._pending),
+                'entries_done': sum(snap['entries_done'] for snap in counted),
+                'entries_total': sum(snap['entries_total'] for snap in counted),
+                'bytes_done': sum(snap['bytes_done'] for snap in snapshots),
+                'bytes_total': sum(snap['bytes_total'] or 0 for snap in snapshots),
+                'speed': sum(snap['speed'] or 0 for job, snap in zip(active, snapshots)
+                             if job.status == "running"),
+                'eta': finish - now if active else None,
+                'finish_at': finish if active else None
+            }
+
+
+class CircuitBreaker:
+    """
+    Cortocircuito por host
+    
+    Tras varios fallos seguidos contra un mismo host se deja de programar
+    trabajo contra él durante un tiempo de enfriamiento. Pasado ese tiempo
+    se permite un intento de prueba: si sale bien el host vuelve a la
+    normalidad y si falla se abre otra vez.
+    """
+    
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 120.0):
+        """
+        Args:
+            failure_threshold: Fallos seguidos que abren el circuito
+            cooldown: Segundos que el circuito permanece abierto
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened_at = {}
+    
+    def allow(self, host: str) -> bool:
+        """
+        Indica si se puede lanzar una petición contra el host
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            return opened_at is None or time.time() - opened_at >= self.cooldown
+    
+    def retry_after(self, host: str) -> float:
+        """
+        Segundos que faltan para que el host vuelva a admitir peticiones
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 0.0
+            return max(self.cooldown - (time.time() - opened_at), 0.0)
+    
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+    
+    def record_failure(self, host: str) -> bool:
+        """
+        Registra un fallo
+        
+        Returns:
+            True si el fallo ha abierto el circuito
+        """
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                self._opened_at[host] = time.time()
+                return True
+            return False
+
+
+class ActivityLog:
+    """
+    Registro de actividad en disco en formato JSON lines
+    
+    Cada registro es una línea JSON con la hora, el nivel, el trabajo y el
+    mensaje. Los registros se encolan sin bloquear y un hilo en segundo
+    plano los escribe por lotes, rotando el archivo al superar max_bytes.
+    Si la cola se llena se descartan los registros más antiguos.
+    """
+    
+    def __init__(self, path: Path, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3,
+                 flush_interval: float = 0.5, max_pending: int = 10000):
+        """
+        Args:
+            path: Archivo de registro
+            max_bytes: Tamaño a partir del cual se rota el archivo
+            backup_count: Archivos antiguos que se conservan (.1, .2, ...)
+            flush_interval: Segundos máximos que espera un registro antes de escribirse
+            max_pending: Registros que caben en la cola en memoria
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        
+        self._pending = collections.deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._file = None
+        self._thread = threading.Thread(target=self._writer, name="activity-log", daemon=True)
+        self._thread.start()
+    
+    def write(self, level: str, message: str, job_id: Optional[str] = None, **fields):
+        """
+        Encola un registro (no bloquea)
+        
+        Args:
+            level: "debug", "info", "warning" o "error"
+            message: Texto del mensaje
+            job_id: Trabajo al que pertenece el mensaje
+            **fields: Campos adicionales del registro
+        """
+        if self._closed:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        elif len(self._pending) > self._pending.maxlen // 2:
+            # Ráfaga: se adelanta la escritura para no llegar a descartar
+            self._wakeup.set()
+        self._pending.append({
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'level': level,
+            'job_id': job_id,
+            'message': message,
+            **fields
+        })
+    
+    def close(self):
+        """
+        Escribe los registros pendientes y detiene el hilo escritor
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+    
+    def _writer(self):
+        """
+        Hilo escritor: vuelca la cola por lotes
+        """
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            closing = self._closed
+            
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                batch.append({'time': datetime.now().isoformat(timespec='milliseconds'),
+                              'level': 'warning', 'job_id': None,
+                              'message': f"{dropped} registros descartados por saturación"})
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except OSError as e:
+                    print(f"❌ Error al escribir el registro de actividad: {e}")
+            
+            if closing:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                return
+    
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Por tramos, para que la rotación respete max_bytes aunque el lote sea grande
+        for start in range(0, len(batch), 500):
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n'
+                                     for record in batch[start:start + 500]))
+            self._file.flush()
+            
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+    
+    def _rotate(self):
+        """
+        Rota los archivos: actividad.jsonl -> actividad.jsonl.1 -> ...
+        """
+        self._file.close()
+        self._file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+class ActivityForwarder:
+    """
+    Sustituto de ActivityLog en los procesos de trabajo
+    
+    Reenvía cada registro al proceso principal, que es el único que
+    escribe (y rota) el archivo de actividad.
+    """
+    
+    def __init__(self, send: Callable[[tuple], None]):
+        self._send = send
+    
+    def write(self, level: str, message: str, job_id: Optional[str] = None, **fields):
+        self._send(('activity', level, message, job_id, fields))
+    
+    def close(self):
+        pass
+
+
+class ThumbnailCache:
+    """
+    Caché de miniaturas con carga en segundo plano
+    
+    Las imágenes se descargan y se reducen una sola vez en un grupo de
+    hilos. El resultado se guarda en disco (JPEG ya reducido) y en memoria
+    (imagen decodificada), ambos con límite de tamaño y expulsión LRU, de
+    modo que volver a una URL no vuelve a descargar ni a decodificar nada.
+    """
+    
+    def __init__(self, cache_dir: Path, max_memory_bytes: int = 16 * 1024 * 1024,
+                 max_disk_bytes: int = 50 * 1024 * 1024, workers: int = 4):
+        """
+        Args:
+            cache_dir: Carpeta de la caché en disco
+            max_memory_bytes: Memoria máxima de las imágenes decodificadas
+            max_disk_bytes: Espacio máximo de la caché en disco
+            workers: Descargas de miniaturas simultáneas
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()  # (url, tamaño) -> Image, en orden de uso
+        self._memory_bytes = 0
+        self._waiting = {}  # (url, tamaño) -> callbacks de las peticiones en curso
+        self._disk_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.jpg"))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="miniaturas")
+    
+    def get(self, url: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+        """
+        Devuelve la miniatura si ya está en memoria (no bloquea)
+        """
+        key = (url, size)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+            return image
+    
+    def request(self, url: str, size: Tuple[int, int], callback: Callable[[Optional[Image.Image]], None]):
+        """
+        Pide una miniatura; callback recibe la imagen (o None si no se pudo
+        obtener) en el hilo que la carga, o de inmediato si está en memoria
+        
+        Args:
+            url: URL de la imagen original
+            size: Tamaño máximo (ancho, alto) de la miniatura
+        """
+        image = self.get(url, size)
+        if image is not None:
+            callback(image)
+            return
+        
+        key = (url, size)
+        with self._lock:
+            # Puede haber terminado de cargarse entre get() y este punto
+            image = self._memory.get(key)
+            if image is None and key in self._waiting:
+                # Ya se está cargando: se comparte el resultado
+                self._waiting[key].append(callback)
+                return
+            if image is None:
+                self._waiting[key] = [callback]
+        if image is not None:
+            callback(image)
+            return
+        self._pool.submit(self._load, key)
+    
+    def shutdown(self):
+        """
+        Descarta las peticiones pendientes y detiene el grupo de hilos
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _load(self, key: Tuple[str, Tuple[int, int]]):
+        """
+        Carga una miniatura desde disco o, si no está, desde la red
+        """
+        url, size = key
+        image = None
+        try:
+            path = self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}_{size[0]}x{size[1]}.jpg"
+            if path.exists():
+                os.utime(path)  # Marca de uso para la expulsión LRU
+                with Image.open(path) as cached:
+                    image = cached.convert('RGB')
+            else:
+                request = Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+                with urlopen(request, timeout=15) as response:
+                    data = response.read(10 * 1024 * 1024)
+                with Image.open(io.BytesIO(data)) as original:
+                    original.draft('RGB', size)  # Decodificación reducida de JPEG
+                    image = original.convert('RGB')
+                image.thumbnail(size)
+                image.save(path, 'JPEG', quality=85)
+                self._add_to_disk(path.stat().st_size)
+            
+            with self._lock:
+                previous = self._memory.pop(key, None)
+                if previous is not None:
+                    self._memory_bytes -= previous.width * previous.height * 3
+                self._memory[key] = image
+                self._memory_bytes += image.width * image.height * 3
+                while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                    _, old = self._memory.popitem(last=False)
+                    self._memory_bytes -= old.width * old.height * 3
+        except Exception:
+            image = None
+        
+        with self._lock:
+            callbacks = self._waiting.pop(key, [])
+        for callback in callbacks:
+            callback(image)
+    
+    def _add_to_disk(self, size: int):
+        """
+        Contabiliza un archivo nuevo y expulsa los menos usados si se pasa del límite
+        """
+        with self._lock:
+            self._disk_bytes += size
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            files = sorted(self.cache_dir.glob("*.jpg"), key=lambda path: path.stat().st_mtime)
+            for path in files:
+                if self._disk_bytes <= self.max_disk_bytes * 0.9:
+                    break
+                try:
+                    file_size = path.stat().st_size
+                    path.unlink()
+                    self._disk_bytes -= file_size
+                except OSError:
+                    pass
+
+
+class ManifestCache:
+    """
+    Caché en disco de la información resuelta de cada video
+    
+    Guarda, durante poco tiempo, el resultado del extractor (lista de
+    formatos con sus URLs de descarga, cabeceras, subtítulos...) para que
+    un reintento, una entrada repetida en un lote o la descarga de un video
+    recién analizado no vuelvan a resolverlo. Cada manifiesto caduca al
+    cumplir su TTL o cuando vence la primera URL de descarga que contiene
+    (parámetro expire de los enlaces firmados), lo que ocurra antes.
+    Los archivos se escriben de forma atómica, así que varios procesos de
+    trabajo pueden compartir la misma carpeta.
+    """
+    
+    # Margen antes del vencimiento de una URL para darla ya por caducada
+    EXPIRY_MARGIN = 120
+    
+    def __init__(self, cache_dir: Path, ttl: float = 30 * 60):
+        """
+        Args:
+            cache_dir: Carpeta de la caché en disco
+            ttl: Segundos que se conserva cada manifiesto como máximo
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._last_prune = 0.0
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Devuelve una copia del manifiesto de la URL si sigue vigente
+        """
+        path = self._path(url)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                record = json.load(f)
+            if 'alias' in record:
+                path = self._path(record['alias'])
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    record = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+        
+        if time.time() >= record.get('expires', 0):
+            path.unlink(missing_ok=True)
+            return None
+        return record.get('info')
+    
+    def put(self, url: str, info: Dict):
+        """
+        Guarda el manifiesto recién resuelto de un video
+        
+        Las emisiones en directo y los manifiestos que no se pueden guardar
+        como JSON (fragmentos generados al vuelo) no se guardan.
+        """
+        if info.get('_type', 'video') != 'video' or info.get('is_live'):
+            return
+        formats = info.get('formats') or [info]
+        if any(callable(fmt.get('fragments')) for fmt in formats):
+            return
+        
+        expires = self._expiry(info)
+        if expires <= time.time():
+            return
+        
+        # Las funciones que deja el extractor (p. ej. __post_extractor) no se
+        # pueden guardar; sin ellas yt-dlp sigue procesando el manifiesto
+        stored = yt_dlp.YoutubeDL.sanitize_info({k: v for k, v in info.items() if not callable(v)})
+        stored.pop('epoch', None)
+        stored.pop('_version', None)
+        
+        canonical = info.get('webpage_url') or url
+        self._write(canonical, {'expires': expires, 'info': stored})
+        if canonical != url:
+            # La URL pedida apunta al manifiesto guardado con la URL canónica
+            self._write(url, {'expires': expires, 'alias': canonical})
+        self._prune()
+    
+    def invalidate(self, url: str):
+        """
+        Descarta el manifiesto de la URL (y el canónico al que apunte)
+        """
+        path = self._path(url)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                alias = json.load(f).get('alias')
+            if alias:
+                self._path(alias).unlink(missing_ok=True)
+        except (OSError, ValueError, EOFError):
+            pass
+        path.unlink(missing_ok=True)
+    
+    def _expiry(self, info: Dict) -> float:
+        """
+        Momento en que el manifiesto deja de ser utilizable
+        """
+        expires = time.time() + self.ttl
+        for fmt in info.get('formats') or [info]:
+            for key in ('url', 'manifest_url'):
+                match = re.search(r'[?&/]expire[=/](\d+)', fmt.get(key) or '')
+                if match:
+                    expires = min(expires, int(match.group(1)) - self.EXPIRY_MARGIN)
+        return expires
+    
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / (hashlib.sha1(url.encode('utf-8')).hexdigest() + ".json.gz")
+    
+    def _write(self, url: str, record: Dict):
+        path = self._path(url)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=3) as f:
+                json.dump(record, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            temp_path.unlink(missing_ok=True)
+    
+    def _prune(self):
+        """
+        Borra los manifiestos caducados (como mucho una vez por minuto)
+        """
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for path in self.cache_dir.glob("*.json.gz"):
+            try:
+                if now - path.stat().st_mtime >= self.ttl:
+                    path.unlink()
+            except OSError:
+                pass
+
+
+class SegmentedHttpFD(HttpFD):
+    """
+    Descargador HTTP por segmentos
+    
+    Divide un archivo progresivo en rangos de bytes que se descargan en
+    paralelo por varias conexiones y se escriben en su posición dentro del
+    archivo temporal. El avance de cada segmento se guarda junto a él
+    (.segments), así que una descarga interrumpida continúa donde se quedó.
+    Si el servidor no admite rangos o el archivo es pequeño se usa la
+    descarga normal de yt-dlp.
+    
+    Se configura con el parámetro 'segmented_download' de yt-dlp:
+    {'connections': 4, 'min_size': 8 * 1024 * 1024}
+    """
+    
+    BLOCK_SIZE = 256 * 1024
+    SAVE_INTERVAL = 1.0
+    SEGMENT_RETRIES = 3
+    
+    def real_download(self, filename, info_dict):
+        options = self.params.get('segmented_download') or {}
+        connections = options.get('connections', 4)
+        if connections < 2 or info_dict.get('request_data') or filename == '-':
+            return super().real_download(filename, info_dict)
+        
+        headers = HTTPHeaderDict({'Accept-Encoding': 'identity'}, info_dict.get('http_headers'))
+        total = self._probe_size(info_dict['url'], headers)
+        if not total or total < options.get('min_size', 8 * 1024 * 1024):
+            return super().real_download(filename, info_dict)
+        
+        return self._download_segments(filename, info_dict, headers, total, connections)
+    
+    def _probe_size(self, url: str, headers: Dict) -> Optional[int]:
+        """
+        Tamaño total del archivo si el servidor admite rangos, None si no
+        """
+        try:
+            response = self.ydl.urlopen(yt_dlp.networking.Request(url, headers={**headers, 'Range': 'bytes=0-0'}))
+        except Exception:
+            return None
+        try:
+            match = re.match(r'bytes\s+0-0/(\d+)', response.headers.get('Content-Range') or '')
+            return int(match.group(1)) if response.status == 206 and match else None
+        finally:
+            response.close()
+    
+    def _download_segments(self, filename: str, info_dict: Dict, headers: Dict, total: int,
+                           connections: int) -> bool:
+        url = info_dict['url']
+        tmpfilename = self.temp_name(filename)
+        state_path = f"{tmpfilename}.segments"
+        
+        self.report_destination(filename)
+        segments = self._load_segments(state_path, tmpfilename, total)
+        if segments is None:
+            # Segmentos [inicio, fin, bytes hechos]; el archivo se reserva entero
+            size = -(-total // connections)
+            segments = [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+            with open(tmpfilename, 'wb') as stream:
+                stream.truncate(total)
+        else:
+            self.report_resuming_byte(sum(done for _, _, done in segments))
+        
+        lock = threading.Lock()
+        stop = threading.Event()
+        errors = []
+        
+        def fetch(segment: List[int]):
+            attempt = 0
+            # Sin búfer: lo que consta como hecho en el estado ya está en el archivo
+            with open(tmpfilename, 'r+b', buffering=0) as stream:
+                while not stop.is_set() and segment[0] + segment[2] <= segment[1]:
+                    start, end, done = segment
+                    try:
+                        response = self.ydl.urlopen(yt_dlp.networking.Request(
+                            url, headers={**headers, 'Range': f'bytes={start + done}-{end}'}))
+                        try:
+                            if response.status != 206:
+                                raise yt_dlp.utils.DownloadError(
+                                    f"el servidor no respetó el rango (HTTP {response.status})")
+                            stream.seek(start + done)
+                            while not stop.is_set():
+                                remaining = end - (start + segment[2]) + 1
+                                if remaining <= 0:
+                                    break
+                                data = response.read(min(self.BLOCK_SIZE, remaining))
+                                if not data:
+                                    raise yt_dlp.utils.ContentTooShortError(start + segment[2], end + 1)
+                                stream.write(data)
+                                with lock:
+                                    segment[2] += len(data)
+                        finally:
+                            response.close()
+                    except Exception as e:
+                        attempt += 1
+                        if attempt > self.SEGMENT_RETRIES:
+                            errors.append(e)
+                            stop.set()
+                            return
+                        self.report_retry(e, attempt, self.SEGMENT_RETRIES)
+                        stop.wait(min(2 ** attempt, 10))
+        
+        workers = [threading.Thread(target=fetch, args=(segment,), daemon=True)
+                   for segment in segments if segment[0] + segment[2] <= segment[1]]
+        for worker in workers:
+            worker.start()
+        
+        start_time = time.time()
+        resumed = sum(done for _, _, done in segments)
+        last_save = start_time
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.2)
+                now = time.time()
+                with lock:
+                    downloaded = sum(done for _, _, done in segments)
+                self._hook_progress({
+                    'status': 'downloading',
+                    'downloaded_bytes': downloaded,
+                    'total_bytes': total,
+                    'filename': filename,
+                    'tmpfilename': tmpfilename,
+                    'speed': self.calc_speed(start_time, now, downloaded - resumed),
+                    'eta': self.calc_eta(start_time, now, total - resumed, downloaded - resumed),
+                    'elapsed': now - start_time,
+                    'ctx_id': info_dict.get('ctx_id'),
+                }, info_dict)
+                if now - last_save >= self.SAVE_INTERVAL:
+                    self._save_segments(state_path, total, segments, lock)
+                    last_save = now
+        finally:
+            # Cancelación o error: se paran las conexiones y se guarda el avance
+            stop.set()
+            for worker in workers:
+                worker.join()
+            self._save_segments(state_path, total, segments, lock)
+        
+        if errors:
+            raise errors[0]
+        
+        os.remove(state_path)
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            'status': 'finished',
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'elapsed': time.time() - start_time,
+            'ctx_id': info_dict.get('ctx_id'),
+        }, info_dict)
+        return True
+    
+    @staticmethod
+    def _load_segments(state_path: str, tmpfilename: str, total: int) -> Optional[List[List[int]]]:
+        """
+        Recupera el avance de una descarga interrumpida del mismo archivo
+        """
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state['total'] == total and os.path.getsize(tmpfilename) == total:
+                return state['segments']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+    
+    @staticmethod
+    def _save_segments(state_path: str, total: int, segments: List[List[int]], lock: threading.Lock):
+        with lock:
+            state = {'total': total, 'segments': [list(segment) for segment in segments]}
+        temp_path = f"{state_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, state_path)
+
+
+class SegmentedYoutubeDL(yt_dlp.YoutubeDL):
+    """
+    YoutubeDL que descarga los formatos progresivos por HTTP con
+    SegmentedHttpFD cuando las opciones incluyen 'segmented_download'
+    """
+    
+    def dl(self, name, info, subtitle=False, test=False):
+        if (test or subtitle or name == '-' or not info.get('url')
+                or not self.params.get('segmented_download')
+                or get_suitable_downloader(info, self.params) is not HttpFD):
+            return super().dl(name, info, subtitle=subtitle, test=test)
+        
+        fd = SegmentedHttpFD(self, self.params)
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        new_info = self._copy_infodict(info)
+        if new_info.get('http_headers') is None:
+            new_info['http_headers'] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+
+class LibraryCatalog:
+    """
+    Catálogo en SQLite de todo lo descargado
+    
+    Guarda una fila por archivo con los datos del video (id, URL, título,
+    canal, duración, formato, tamaño, ruta y fecha) e índices para
+    consultar sin recorrer las carpetas. Las búsquedas de texto usan FTS5
+    cuando SQLite lo incluye.
+    """
+    
+    MEDIA_EXTENSIONS = {'.mp4', '.mkv', '.webm', '.mov', '.avi', '.flv', '.3gp',
+                        '.m4a', '.mp3', '.opus', '.ogg', '.aac', '.flac', '.wav'}
+    
+    # Id entre corchetes al final del nombre ("Título [id].ext", como en las
+    # plantillas de _get_ydl_options y la de yt-dlp por defecto) y sufijo de
+    # tramo (" [60-150]", ver start_download)
+    ID_PATTERN = re.compile(r'\s*\[([\w-]{6,})\]$')
+    SECTION_PATTERN = re.compile(r'\s*\[\d+-(?:\d+|fin)\]$')
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                id INTEGER PRIMARY KEY,
+                video_id TEXT,
+                extractor TEXT,
+                url TEXT,
+                title TEXT,
+                uploader TEXT,
+                duration INTEGER,
+                format TEXT,
+                size INTEGER,
+                path TEXT NOT NULL UNIQUE,
+                mtime REAL,
+                downloaded_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_downloads_video ON downloads (video_id, extractor);
+            CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads (url);
+            CREATE INDEX IF NOT EXISTS idx_downloads_title ON downloads (title COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_downloads_uploader ON downloads (uploader COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_downloads_date ON downloads (downloaded_at);
+        """)
+        
+        # Índice de texto completo sincronizado con la tabla mediante disparadores
+        try:
+            self._db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts
+                    USING fts5(title, uploader, content='downloads', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS downloads_ai AFTER INSERT ON downloads BEGIN
+                    INSERT INTO downloads_fts (rowid, title, uploader)
+                    VALUES (new.id, new.title, new.uploader);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_ad AFTER DELETE ON downloads BEGIN
+                    INSERT INTO downloads_fts (downloads_fts, rowid, title, uploader)
+                    VALUES ('delete', old.id, old.title, old.uploader);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_au AFTER UPDATE ON downloads BEGIN
+                    INSERT INTO downloads_fts (downloads_fts, rowid, title, uploader)
+                    VALUES ('delete', old.id, old.title, old.uploader);
+                    INSERT INTO downloads_fts (rowid, title, uploader)
+                    VALUES (new.id, new.title, new.uploader);
+                END;
+            """)
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+        self._db.commit()
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+    
+    def record(self, info: Dict[str, Any], path: str):
+        """
+        Registra (o actualiza) un archivo descargado a partir de la
+        información de yt-dlp
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        
+        with self._lock:
+            self._db.execute("""
+                INSERT INTO downloads (video_id, extractor, url, title, uploader, duration,
+                                       format, size, path, mtime, downloaded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    video_id = excluded.video_id, extractor = excluded.extractor,
+                    url = excluded.url, title = excluded.title, uploader = excluded.uploader,
+                    duration = excluded.duration, format = excluded.format, size = excluded.size,
+                    mtime = excluded.mtime, downloaded_at = excluded.downloaded_at
+            """, (
+                info.get('id'),
+                info.get('extractor_key'),
+                info.get('webpage_url') or info.get('original_url'),
+                info.get('title'),
+                info.get('uploader') or info.get('channel'),
+                int(info['duration']) if info.get('duration') else None,
+                info.get('format'),
+                stat.st_size,
+                path,
+                stat.st_mtime,
+                time.time()
+            ))
+            self._db.commit()
+    
+    def find(self, video_id: Optional[str] = None, url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Busca un video ya descargado por id o por URL
+        """
+        if video_id:
+            query, params = "SELECT * FROM downloads WHERE video_id = ?", (video_id,)
+        elif url:
+            query, params = "SELECT * FROM downloads WHERE url = ?", (url,)
+        else:
+            return []
+        with self._lock:
+            return [dict(row) for row in self._db.execute(query, params)]
+    
+    def search(self, text: str = "", uploader: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Busca en el catálogo por texto (título o canal), del más reciente al más antiguo
+        
+        Args:
+            text: Palabras a buscar (por prefijo); vacío devuelve lo último descargado
+            uploader: Limita la búsqueda a un canal
+            limit: Número máximo de resultados
+        """
+        conditions = []
+        params = []
+        words = text.split()
+        if words and self._fts:
+            # Cada palabra entre comillas (sin sintaxis FTS del usuario) y por prefijo
+            match = ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+            conditions.append("id IN (SELECT rowid FROM downloads_fts WHERE downloads_fts MATCH ?)")
+            params.append(match)
+        elif words:
+            for word in words:
+                conditions.append("(title LIKE ? OR uploader LIKE ?)")
+                params += [f"%{word}%", f"%{word}%"]
+        if uploader:
+            conditions.append("uploader = ? COLLATE NOCASE")
+            params.append(uploader)
+        
+        query = "SELECT * FROM downloads"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY downloaded_at DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            return [dict(row) for row in self._db.execute(query, params)]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+    
+    def rescan(self, folders: List[str], batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Actualiza el catálogo con el contenido de las carpetas
+        
+        Solo se tocan los archivos nuevos, los que cambiaron de tamaño o
+        fecha y los que ya no existen; los demás se comparan con lo guardado
+        sin abrirlos. Los datos de los archivos nuevos salen del .info.json
+        que tengan al lado o, si no, del nombre (título e id entre corchetes),
+        de modo que vuelven a servir para detectar duplicados.
+        
+        Returns:
+            Dict con 'added', 'updated', 'removed' y 'unchanged'
+        """
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        
+        for folder in folders:
+            root = os.path.abspath(folder)
+            prefix = os.path.join(root, '')
+            with self._lock:
+                # Rango [prefijo, prefijo + carácter máximo): usa el índice de path
+                known = {
+                    row['path']: (row['size'], row['mtime'])
+                    for row in self._db.execute(
+                        "SELECT path, size, mtime FROM downloads WHERE path >= ? AND path < ?",
+                        (prefix, prefix + '\U0010ffff'))
+                }
+            
+            inserts = []
+            updates = []
+            for path, stat in self._walk_media(root):
+                previous = known.pop(path, None)
+                if previous is None:
+                    info = self._identify(path)
+                    inserts.append((
+                        info.get('id'),
+                        info.get('extractor_key'),
+                        info.get('webpage_url') or info.get('original_url'),
+                        info.get('title'),
+                        info.get('uploader') or info.get('channel'),
+                        int(info['duration']) if info.get('duration') else None,
+                        info.get('format'),
+                        stat.st_size, path, stat.st_mtime, stat.st_mtime
+                    ))
+                elif previous != (stat.st_size, stat.st_mtime):
+                    updates.append((stat.st_size, stat.st_mtime, path))
+                else:
+                    stats['unchanged'] += 1
+                
+                if len(inserts) + len(updates) >= batch_size:
+                    self._apply_rescan(inserts, updates, [])
+                    stats['added'] += len(inserts)
+                    stats['updated'] += len(updates)
+                    inserts, updates = [], []
+            
+            # Lo que queda en known ya no está en disco
+            self._apply_rescan(inserts, updates, [(path,) for path in known])
+            stats['added'] += len(inserts)
+            stats['updated'] += len(updates)
+            stats['removed'] += len(known)
+        
+        return stats
+    
+    def _apply_rescan(self, inserts: List[tuple], updates: List[tuple], deletes: List[tuple]):
+        with self._lock:
+            with self._db:
+                self._db.executemany("""
+                    INSERT INTO downloads (video_id, extractor, url, title, uploader, duration,
+                                           format, size, path, mtime, downloaded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, inserts)
+                self._db.executemany("UPDATE downloads SET size = ?, mtime = ? WHERE path = ?", updates)
+                self._db.executemany("DELETE FROM downloads WHERE path = ?", deletes)
+    
+    def _identify(self, path: str) -> Dict[str, Any]:
+        """
+        Recupera los datos de un archivo que no está en el catálogo
+        """
+        base = os.path.splitext(path)[0]
+        name = self.SECTION_PATTERN.sub('', os.path.basename(base))
+        for info_path in (base + '.info.json', os.path.join(os.path.dirname(path), name + '.info.json')):
+            try:
+                with open(info_path, 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+                if isinstance(info, dict) and info.get('id'):
+                    return info
+            except (OSError, ValueError):
+                continue
+        
+        info = {}
+        match = self.ID_PATTERN.search(name)
+        if match:
+            info['id'] = match.group(1)
+            name = name[:match.start()]
+        info['title'] = re.sub(r'^\d+ - ', '', name)
+        return info
+    
+    def _walk_media(self, root: str):
+        """
+        Recorre una carpeta y devuelve (ruta, stat) de cada archivo multimedia
+        """
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in self.MEDIA_EXTENSIONS:
+                            yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+
+class CatalogPostProcessor(yt_dlp.postprocessor.PostProcessor):
+    """
+    Registra cada archivo terminado en el catálogo de la biblioteca
+    """
+    
+    def __init__(self, catalog: LibraryCatalog):
+        super().__init__()
+        self.catalog = catalog
+    
+    def run(self, info):
+        if info.get('filepath'):
+            try:
+                self.catalog.record(info, info['filepath'])
+            except sqlite3.Error as e:
+                self.report_warning(f"No se pudo registrar en la biblioteca: {e}")
+        return [], info
+
+
+class ProfileSession:
+    """
+    Sesión de perfilado de una operación (análisis de URL o trabajo de descarga)
+    
+    Perfila con cProfile el hilo que la abre, mide aparte el tiempo del hook
+    de progreso y de los callbacks de la interfaz, y sigue la memoria con
+    tracemalloc: muestras periódicas, pico y, cada vez que una muestra marca
+    un nuevo máximo, una instantánea de las líneas que más memoria tienen
+    reservada. Al cerrarse escribe un informe de texto.
+    """
+    
+    # tracemalloc es global: se mantiene activo mientras haya alguna sesión abierta
+    _tracemalloc_users = 0
+    _tracemalloc_lock = threading.Lock()
+    
+    # Solo puede haber un cProfile activo a la vez (desde Python 3.12 el
+    # segundo falla); las demás sesiones se quedan sin perfil de CPU
+    _cprofile_lock = threading.Lock()
+    
+    def __init__(self, name: str, report_dir: Path, sample_interval: float = 1.0):
+        """
+        Args:
+            name: Nombre de la operación (id del trabajo o "analisis")
+            report_dir: Carpeta donde se guarda el informe
+            sample_interval: Segundos mínimos entre muestras de memoria
+        """
+        self.name = name
+        report_dir.mkdir(parents=True, exist_ok=True)
+        self.report_path = report_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}.txt"
+        self.sample_interval = sample_interval
+        self.profile = None  # cProfile, si no había otra sesión perfilando
+        
+        self.hook_calls = 0
+        self.hook_seconds = 0.0
+        self.hook_max = 0.0
+        self.callback_seconds = 0.0
+        self.memory_samples = []  # (segundos desde el inicio, bytes trazados)
+        self._peak_sample = 0
+        self._peak_snapshot = None
+        self._started = None
+        self._start_memory = 0
+        self._start_peak = 0
+    
+    @property
+    def cpu_profiled(self) -> bool:
+        """
+        Indica si la sesión tiene perfil de CPU
+        """
+        return self.profile is not None
+    
+    def __enter__(self) -> 'ProfileSession':
+        with ProfileSession._tracemalloc_lock:
+            if ProfileSession._tracemalloc_users == 0:
+                tracemalloc.start()
+            ProfileSession._tracemalloc_users += 1
+        # El pico de tracemalloc es de todo el proceso: no se reinicia para
+        # no borrar el de otras sesiones abiertas
+        self._start_memory, self._start_peak = tracemalloc.get_traced_memory()
+        
+        self._started = time.perf_counter()
+        self.sample_memory(force=True)
+        if ProfileSession._cprofile_lock.acquire(blocking=False):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile:
+            self.profile.disable()
+            ProfileSession._cprofile_lock.release()
+        elapsed = time.perf_counter() - self._started
+        self.sample_memory(force=True)
+        _, peak = tracemalloc.get_traced_memory()
+        if peak <= self._start_peak:
+            # El máximo del proceso es anterior a la sesión: vale el mayor muestreado
+            peak = max(size for _, size in self.memory_samples)
+        snapshot = self._peak_snapshot or tracemalloc.take_snapshot()
+        
+        with ProfileSession._tracemalloc_lock:
+            ProfileSession._tracemalloc_users -= 1
+            if ProfileSession._tracemalloc_users == 0:
+                tracemalloc.stop()
+        
+        self._write_report(elapsed, peak, snapshot, exc)
+        return False
+    
+    def record_hook(self, seconds: float):
+        """
+        Acumula el tiempo de una llamada al hook de progreso
+        """
+        self.hook_calls += 1
+        self.hook_seconds += seconds
+        self.hook_max = max(self.hook_max, seconds)
+        self.sample_memory()
+    
+    def sample_memory(self, force: bool = False):
+        """
+        Guarda una muestra de la memoria trazada (como mucho una por intervalo)
+        """
+        now = time.perf_counter() - self._started
+        if force or not self.memory_samples or now - self.memory_samples[-1][0] >= self.sample_interval:
+            current = tracemalloc.get_traced_memory()[0]
+            self.memory_samples.append((now, current))
+            if current > self._peak_sample * 1.1:
+                # Nuevo máximo: se guarda qué lo está ocupando
+                self._peak_sample = current
+                self._peak_snapshot = tracemalloc.take_snapshot()
+    
+    def _write_report(self, elapsed: float, peak: int, snapshot: tracemalloc.Snapshot, exc):
+        mb = 1024 * 1024
+        lines = [
+            f"📈 INFORME DE PERFILADO: {self.name}",
+            "=" * 70,
+            f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Duración: {elapsed:.2f} s" + (f" (terminó con error: {exc})" if exc else ""),
+            "",
+            "🪝 Hook de progreso",
+            f"   Llamadas: {self.hook_calls}",
+            f"   Tiempo total: {self.hook_seconds:.3f} s (máximo por llamada: {self.hook_max * 1000:.1f} ms)",
+            f"   De ello en callbacks de la interfaz: {self.callback_seconds:.3f} s",
+            "",
+            "🧠 Memoria (tracemalloc)",
+            f"   Pico: {peak / mb:.1f} MB ({(peak - self._start_memory) / mb:+.1f} MB sobre el inicio)",
+            "   Muestras (s: MB): " + ", ".join(f"{t:.0f}: {size / mb:.1f}" for t, size in self.memory_samples[:60]),
+            "",
+            "   Líneas con más memoria reservada en el pico muestreado:",
+        ]
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        for stat in snapshot.statistics('lineno')[:15]:
+            frame = stat.traceback[0]
+            lines.append(f"   {stat.size / 1024:10.1f} KB  {stat.count:7d} bloques  {frame.filename}:{frame.lineno}")
+        
+        if not self.profile:
+            lines += ["", "⏱️ Sin perfil de CPU: otra sesión estaba perfilando a la vez"]
+        else:
+            for sort_key, title in (('cumulative', "tiempo acumulado"), ('tottime', "tiempo propio")):
+                output = io.StringIO()
+                pstats.Stats(self.profile, stream=output).strip_dirs().sort_stats(sort_key).print_stats(25)
+                lines += ["", f"⏱️ Funciones con más {title}", output.getvalue()]
+        
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+
+class ProcessWorkerPool:
+    """
+    Procesos de trabajo para análisis y descargas
+    
+    Cada tarea corre en un proceso aparte, con su propio GIL, de modo que la
+    extracción (Python puro: expresiones regulares, JSON, firmas) escala con
+    los núcleos y un extractor colgado no bloquea la aplicación. Los
+    procesos se crean con "spawn", se reutilizan entre tareas y se conservan
+    como mucho max_idle libres. Las tareas, los mensajes y el progreso
+    viajan por una tubería con cada proceso.
+    """
+    
+    def __init__(self, max_idle: int = 2, cancel_grace: float = 10.0):
+        """
+        Args:
+            max_idle: Procesos libres que se conservan para las siguientes tareas
+            cancel_grace: Segundos que se espera a que una tarea cancelada
+                termine antes de matar su proceso
+        """
+        self.max_idle = max_idle
+        self.cancel_grace = cancel_grace
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = []  # (proceso, conexión)
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def run(self, task: str, payload: Dict[str, Any], on_message: Callable[[tuple], None],
+            cancel_event: Optional[threading.Event] = None) -> Any:
+        """
+        Ejecuta una tarea en un proceso libre y espera su resultado
+        
+        Args:
+            task: "analyze" o "download"
+            payload: Datos de la tarea (deben poder serializarse con pickle)
+            on_message: Función a la que se pasa cada mensaje del proceso:
+                ('log', ...), ('activity', ...) o ('progress', ...)
+            cancel_event: Evento que, al activarse, cancela la tarea
+            
+        Returns:
+            El resultado de la tarea
+            
+        Raises:
+            DownloadCancelled: Si la tarea se canceló y el proceso no respondió
+            Exception: Con el mensaje de error de la tarea, o si el proceso murió
+        """
+        worker = self._acquire()
+        process, conn = worker
+        finished = False
+        cancel_sent = None
+        try:
+            conn.send((task, payload))
+            while True:
+                if cancel_event is not None and cancel_event.is_set() and cancel_sent is None:
+                    conn.send(('cancel',))
+                    cancel_sent = time.time()
+                if cancel_sent is not None and time.time() - cancel_sent > self.cancel_grace:
+                    raise yt_dlp.utils.DownloadCancelled("el proceso de trabajo no respondió y se detuvo")
+                
+                if not conn.poll(0.2):
+                    if not process.is_alive():
+                        raise Exception(f"el proceso de trabajo terminó inesperadamente (código {process.exitcode})")
+                    continue
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    raise Exception("el proceso de trabajo terminó inesperadamente")
+                
+                if message[0] == 'result':
+                    finished = True
+                    return message[1]
+                if message[0] == 'error':
+                    finished = True
+                    raise Exception(message[1])
+                on_message(message)
+        finally:
+            # Un proceso que no llegó a terminar su tarea no se reutiliza
+            if finished:
+                self._release(worker)
+            else:
+                self._stop(worker, kill=True)
+    
+    def shutdown(self):
+        """
+        Detiene los procesos libres (los ocupados terminan con la aplicación)
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self._stop(worker)
+    
+    def _acquire(self):
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker[0].is_alive():
+                    return worker
+                worker[1].close()
+        
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=ProcessWorkerPool._worker_main, args=(child_conn,),
+                                        name="descargador-trabajo", daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+    
+    def _release(self, worker):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(worker)
+                return
+        self._stop(worker)
+    
+    @staticmethod
+    def _stop(worker, kill: bool = False):
+        process, conn = worker
+        if not kill:
+            try:
+                conn.send(('stop',))
+                process.join(timeout=5)
+            except OSError:
+                pass
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
+        conn.close()
+    
+    @staticmethod
+    def _worker_main(conn):
+        """
+        Bucle de un proceso de trabajo
+        
+        Un hilo lector recibe las tareas y las cancelaciones mientras el hilo
+        principal ejecuta cada tarea con un VideoDownloader propio, cuyos
+        mensajes, progreso y registros de actividad se reenvían al proceso
+        principal.
+        """
+        send_lock = threading.Lock()
+        last_progress = [0.0]
+        
+        def send(message: tuple):
+            with send_lock:
+                conn.send(message)
+        
+        def on_progress(status: str, data: Any):
+            # El avance de cada bloque se limita a 10 mensajes por segundo
+            if status == "progress":
+                now = time.time()
+                if now - last_progress[0] < 0.1:
+                    return
+                last_progress[0] = now
+            send(('progress', status, data))
+        
+        downloader = VideoDownloader(progress_callback=on_progress,
+                                     log_callback=lambda message: send(('log', message)))
+        downloader.activity_log.close()
+        downloader.activity_log = ActivityForwarder(send)
+        
+        tasks = queue.Queue()
+        cancel_requested = threading.Event()
+        current = {'job': None}
+        
+        def reader():
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    message = ('stop',)
+                if message[0] == 'stop':
+                    tasks.put(None)
+                    return
+                if message[0] == 'cancel':
+                    cancel_requested.set()
+                    job = current['job']
+                    if job is not None:
+                        job.cancelled = True
+                        job.cancel_event.set()
+                else:
+                    cancel_requested.clear()
+                    tasks.put(message)
+        
+        threading.Thread(target=reader, name="trabajo-lector", daemon=True).start()
+        try:
+            while True:
+                message = tasks.get()
+                if message is None:
+                    break
+                task, payload = message
+                for name, value in payload['settings'].items():
+                    setattr(downloader, name, value)
+                
+                try:
+                    if task == "analyze":
+                        send(('result', downloader.get_video_info(payload['url'])))
+                        continue
+                    
+                    job = DownloadJob(**payload['job'])
+                    job.status = "running"
+                    job.started_at = time.time()
+                    current['job'] = job
+                    if cancel_requested.is_set():
+                        job.cancelled = True
+                        job.cancel_event.set()
+                    downloader._download_thread(job)
+                    if job.status == "running":
+                        job.status = "cancelled" if job.cancelled else "completed"
+                    send(('result', {
+                        'status': job.status,
+                        'report': job.report,
+                        'profile_report': job.profile_report,
+                        'progress': job.progress.snapshot()
+                    }))
+                except Exception as e:
+                    send(('error', str(e)))
+                finally:
+                    current['job'] = None
+        finally:
+            downloader.close()
+
+
+class VideoDownloader:
+    """
+    Clase que maneja toda la lógica de descarga de videos y playlists
+    """
+    
+    def __init__(self, progress_callback: Optional[Callable] = None, 
+                 log_callback: Optional[Callable] = None, max_workers: int = 2,
+                 max_per_host: int = 2):
+        """
+        Constructor del descargador
+        
+        Args:
+            progress_callback: Función que se llama durante el progreso de descarga
+            log_callback: Función que se llama para registrar mensajes
+            max_workers: Número máximo de descargas simultáneas
+            max_per_host: Número máximo de descargas simultáneas contra un mismo sitio
+        """
+        self.progress_callback = progress_callback
+        self.log_callback = log_callback
+        self.current_download_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        
+        # Carpeta de datos de la aplicación (estado de sincronización, etc.)
+        self.data_dir = Path.home() / ".descargador_videos"
+        
+        # Espacio libre mínimo que debe quedar en disco al admitir cada entrada
+        self.min_free_space = 500 * 1024 * 1024
+        
+        # Reintentos: backoff exponencial con jitter y cortocircuito por host
+        self.max_attempts = 3
+        self.retry_base_delay = 2.0
+        self.retry_max_delay = 60.0
+        self.circuit_breaker = CircuitBreaker()
+        
+        # Calidad adaptativa: tiempo de descarga objetivo por entrada (segundos)
+        self.adaptive_target_time = 300.0
+        
+        # Perfilado opcional de análisis y descargas (informes en profile_dir)
+        self.profiling = False
+        self.profile_dir = self.data_dir / "perfiles"
+        
+        # Conexiones simultáneas por archivo progresivo (1 desactiva la descarga por segmentos)
+        self.segment_connections = 4
+        
+        # Dónde se ejecutan análisis y descargas: "thread" (hilos de este
+        # proceso) o "process" (procesos de trabajo, ver ProcessWorkerPool)
+        self.worker_backend = "thread"
+        self._workers = None
+        
+        # Cola de descargas con prioridades
+        self.scheduler = DownloadScheduler(self._download_thread, max_workers=max_workers,
+                                           max_per_host=max_per_host)
+        self._job_counter = 0
+        self._job_lock = threading.Lock()
+        
+        # Crear carpeta de descargas por defecto
+        Path(self.current_download_path).mkdir(exist_ok=True)
+        self.data_dir.mkdir(exist_ok=True)
+        
+        # Registro de actividad en disco; el trabajo de cada hilo de descarga
+        # se guarda en _job_context para etiquetar sus mensajes
+        self.activity_log = ActivityLog(self.data_dir / "logs" / "actividad.jsonl")
+        self._job_context = threading.local()
+        
+        # Miniaturas de videos y playlists
+        self.thumbnails = ThumbnailCache(self.data_dir / "miniaturas")
+        
+        # Información resuelta de cada video (formatos y enlaces de descarga),
+        # compartida entre el análisis y las descargas
+        self.manifests = ManifestCache(self.data_dir / "manifiestos")
+        
+        # Estado de las sincronizaciones (index.json), compartido entre trabajos
+        self._sync_lock = threading.Lock()
+        
+        # Catálogo de todo lo descargado
+        self.catalog = LibraryCatalog(self.data_dir / "biblioteca.db")
+    
+    def close(self):
+        """
+        Vuelca y cierra el registro de actividad y el catálogo y detiene la
+        carga de miniaturas (al salir de la aplicación)
+        """
+        if self._workers:
+            self._workers.shutdown()
+        self.thumbnails.shutdown()
+        self.catalog.close()
+        self.activity_log.close()
+    
+    @staticmethod
+    def _message_level(message: str) -> str:
+        """
+        Deduce el nivel de un mensaje por su emoji
+        """
+        if message.startswith("❌"):
+            return "error"
+        if message.startswith(("⚠️", "⛔")):
+            return "warning"
+        return "info"
+    
+    def log_message(self, message: str, level: Optional[str] = None, job_id: Optional[str] = None):
+        """
+        Registra un mensaje usando el callback si está disponible y lo
+        guarda en el registro de actividad
+        
+        Args:
+            level: Nivel del mensaje; por defecto se deduce del emoji
+            job_id: Trabajo del mensaje; por defecto el del hilo actual
+        """
+        if job_id is None:
+            job_id = getattr(self._job_context, 'job_id', None)
+        self.activity_log.write(level or self._message_level(message), message, job_id)
+        self._show_message(message)
+    
+    def _show_message(self, message: str):
+        """
+        Muestra un mensaje en la interfaz (o en la consola si no hay callback)
+        """
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+    
+    def set_download_path(self, path: str):
+        """
+        Establece la carpeta de descarga
+        """
+        self.current_download_path = path
+        Path(path).mkdir(exist_ok=True)
+        self.log_message(f"📁 Carpeta de descarga cambiada a: {path}")
+    
+    def set_profiling(self, enabled: bool):
+        """
+        Activa o desactiva el perfilado de análisis y descargas
+        
+        Cada análisis y cada trabajo que empiece con el perfilado activo
+        deja un informe en la carpeta de perfiles.
+        """
+        self.profiling = enabled
+        self.log_message(f"📈 Perfilado {'activado' if enabled else 'desactivado'}")
+    
+    def set_worker_backend(self, backend: str):
+        """
+        Elige dónde se ejecutan los análisis y las descargas
+        
+        Args:
+            backend: "thread" para hilos de este proceso o "process" para
+                procesos de trabajo (aprovecha varios núcleos en la
+                extracción y aísla los extractores colgados). Afecta a los
+                trabajos que empiecen a partir de ahora
+        """
+        if backend not in ("thread", "process"):
+            raise ValueError(f"modo de ejecución desconocido: {backend}")
+        self.worker_backend = backend
+        self.log_message(f"⚙️ Análisis y descargas en {'procesos' if backend == 'process' else 'hilos'}")
+    
+    @property
+    def workers(self) -> ProcessWorkerPool:
+        """
+        Procesos de trabajo (se crean al usarlos por primera vez)
+        """
+        with self._job_lock:
+            if self._workers is None:
+                self._workers = ProcessWorkerPool(max_idle=self.scheduler.max_workers)
+            return self._workers
+    
+    def list_profile_reports(self) -> List[Path]:
+        """
+        Devuelve los informes de perfilado, del más reciente al más antiguo
+        """
+        if not self.profile_dir.exists():
+            return []
+        return sorted(self.profile_dir.glob("*.txt"), reverse=True)
+    
+    def _profile_session(self, name: str) -> ProfileSession:
+        """
+        Crea una sesión de perfilado asociada al hilo actual
+        """
+        session = ProfileSession(name, self.profile_dir)
+        self._job_context.profile = session
+        return session
+    
+    def _finish_profile_session(self, session: ProfileSession, job_id: Optional[str] = None):
+        """
+        Desasocia la sesión del hilo y avisa de dónde quedó el informe
+        """
+        self._job_context.profile = None
+        if not session.cpu_profiled:
+            self.log_message("⚠️ Perfil de CPU omitido: ya había otra operación perfilándose", job_id=job_id)
+        self.log_message(f"📈 Informe de perfilado: {session.report_path}", job_id=job_id)
+        if self.progress_callback:
+            self.progress_callback("profile", {'job_id': job_id, 'path': str(session.report_path)})
+    
+    def get_video_info(self, url: str) -> Dict[str, Any]:
+        """
+        Obtiene información de un video o playlist sin descargarlo
+        
+        Args:
+            url: URL del video o playlist
+            
+        Returns:
+            Dict con la información extraída
+        """
+        if self.worker_backend == "process":
+            return self.workers.run("analyze", {'url': url, 'settings': self._worker_settings()},
+                                    self._handle_worker_message)
+        
+        if not self.profiling:
+            return self._get_video_info(url)
+        
+        session = self._profile_session("analisis")
+        try:
+            with session:
+                return self._get_video_info(url)
+        finally:
+            self._finish_profile_session(session)
+    
+    def _get_video_info(self, url: str) -> Dict[str, Any]:
+        try:
+            self.log_message("🔍 Obteniendo información...")
+            
+            ydl_opts = {
+                'quiet': True,
+                'no_warnings': True,
+                # En playlists solo se listan las entradas, sin extraer cada video
+                'extract_flat': 'in_playlist',
+            }
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = self.manifests.get(url)
+                if info is None:
+                    info = ydl.extract_info(url, download=False, process=False)
+                    self.manifests.put(url, info)
+                info = ydl.process_ie_result(info, download=False)
+            
+            if 'entries' in info:  # Es una playlist
+                processed_info = self._process_playlist_info(info)
+            else:  # Es un video individual
+                processed_info = self._process_video_info(info)
+            
+            # Liberar la información cruda de yt-dlp en cuanto se ha procesado
+            info.clear()
+            del info
+            return processed_info
+            
+        except Exception as e:
+            error_msg = f"❌ Error al obtener información: {str(e)}"
+            self.log_message(error_msg)
+            raise Exception(error_msg)
+    
+    def _process_video_info(self, info: Dict) -> Dict[str, Any]:
+        """
+        Procesa información de un video individual
+        """
+        processed_info = {
+            'type': 'video',
+            'title': info.get('title', 'Sin título'),
+            'uploader': info.get('uploader', 'Desconocido'),
+            'duration': info.get('duration', 0),
+            'view_count': info.get('view_count', 'N/A'),
+            'upload_date': info.get('upload_date', 'Desconocida'),
+            'thumbnail': pick_thumbnail(info),
+            'formats': [],
+            # Copias ya descargadas según la biblioteca
+            'in_library': [row['path'] for row in self.catalog.find(video_id=info.get('id'))
+                           if row['extractor'] in (None, info.get('extractor_key'))]
+        }
+        
+        # Extraer formatos disponibles
+        if 'formats' in info:
+            formats_seen = set()
+            for fmt in info['formats']:
+                if fmt.get('height') and fmt.get('vcodec') != 'none':  # Filtrar solo video
+                    quality = f"{fmt['height']}p"
+                    if quality not in formats_seen:
+                        processed_info['formats'].append(quality)
+                        formats_seen.add(quality)
+            
+            # Ordenar calidades de menor a mayor
+            quality_order = {'480p': 480, '720p': 720, '1080p': 1080, '1440p': 1440, '2160p': 2160}
+            processed_info['formats'].sort(key=lambda x: quality_order.get(x, int(x.replace('p', ''))))
+        
+        self._log_video_info(processed_info)
+        return processed_info
+    
+    def _process_playlist_info(self, info: Dict) -> Dict[str, Any]:
+        """
+        Procesa información de una playlist
+        """
+        videos = PlaylistEntry.from_playlist(info)
+        
+        processed_info = {
+            'type': 'playlist',
+            'title': info.get('title', 'Sin título'),
+            'uploader': info.get('uploader', 'Desconocido'),
+            'thumbnail': pick_thumbnail(info),
+            'total_videos': len(videos),
+            'videos': videos
+        }
+        
+        self._log_playlist_info(processed_info)
+        return processed_info
+    
+    def _log_video_info(self, info: Dict):
+        """
+        Registra información de un video
+        """
+        self.log_message("=" * 50)
+        self.log_message("📺 INFORMACIÓN DEL VIDEO")
+        self.log_message("=" * 50)
+        
+        self.log_message(f"🎬 Título: {info['title']}")
+        self.log_message(f"👤 Canal: {info['uploader']}")
+        self.log_message(f"📅 Fecha de subida: {info['upload_date']}")
+        
+        if info['duration']:
+            minutos = info['duration'] // 60
+            segundos = info['duration'] % 60
+            self.log_message(f"⏱️ Duración: {minutos}:{segundos:02d}")
+        
+        self.log_message(f"👀 Visualizaciones: {info['view_count']}")
+        
+        if info['formats']:
+            self.log_message("🎥 Calidades disponibles:")
+            for quality in info['formats']:
+                self.log_message(f"   • {quality}")
+    
+    def _log_playlist_info(self, info: Dict):
+        """
+        Registra información de una playlist
+        """
+        self.log_message("=" * 50)
+        self.log_message("📋 INFORMACIÓN DE LA PLAYLIST")
+        self.log_message("=" * 50)
+        
+        self.log_message(f"📋 Título de la playlist: {info['title']}")
+        self.log_message(f"👤 Canal: {info['uploader']}")
+        self.log_message(f"🎥 Total de videos: {info['total_videos']}")
+        self.log_message("")
+        
+        self.log_message("📝 Lista de videos:")
+        for video in info['videos'][:10]:  # Solo primeros 10
+            duration_str = ""
+            if video.duration:
+                minutos = video.duration // 60
+                segundos = video.duration % 60
+                duration_str = f" ({minutos}:{segundos:02d})"
+            
+            self.log_message(f"   {video.index:2d}. {video.title}{duration_str}")
+        
+        if info['total_videos'] > 10:
+            self.log_message(f"   ... y {info['total_videos'] - 10} videos más")
+    
+    def start_download(self, url: str, download_type: str = "single", 
+                      quality: str = "720p", download_path: Optional[str] = None,
+                      playlist_filters: Optional[Dict[str, Any]] = None,
+                      check_space: bool = False, space_policy: str = "trim",
+                      priority: Optional[str] = None,
+                      target_time: Optional[float] = None,
+                      start_time: Any = None, end_time: Any = None) -> Optional[str]:
+        """
+        Encola una descarga
+        
+        Args:
+            url: URL del video o playlist
+            download_type: "single", "playlist" o "sync" (sincronización
+                incremental de un canal o playlist)
+            quality: Calidad deseada
+            download_path: Carpeta de descarga (opcional)
+            playlist_filters: Filtros de playlist (opcional). Claves admitidas:
+                'items' (p.ej. "1-10,15"), 'min_duration' y 'max_duration'
+                (segundos o "mm:ss"), 'date_after' y 'date_before' (AAAAMMDD)
+                y 'title_regex'
+            check_space: Estimar el tamaño total antes de empezar y
+                compararlo con el espacio libre
+            space_policy: Qué hacer si no hay espacio: "trim" descarga solo
+                las entradas que caben y "refuse" cancela la descarga
+            priority: "high", "normal" o "low". Por defecto los videos
+                individuales van con prioridad alta y el resto con normal
+            target_time: Con la calidad "Adaptativa", segundos de descarga
+                objetivo por entrada (por defecto adaptive_target_time)
+            start_time: Inicio del tramo a descargar (segundos o "h:mm:ss").
+                Con start_time o end_time solo se descarga ese tramo de cada
+                video (requiere ffmpeg)
+            end_time: Fin del tramo a descargar; sin él, hasta el final
+            
+        Returns:
+            Identificador del trabajo, o None si no se pudo encolar
+        """
+        if not url.strip():
+            self.log_message("❌ URL vacía")
+            return None
+        
+        if space_policy not in ("trim", "refuse"):
+            self.log_message(f"❌ Política de espacio desconocida: {space_policy}")
+            return None
+        
+        if priority is None:
+            priority = "high" if download_type == "single" else "normal"
+        if priority not in PRIORITIES:
+            self.log_message(f"❌ Prioridad desconocida: {priority}")
+            return None
+        
+        if target_time is not None and target_time <= 0:
+            self.log_message("❌ El tiempo objetivo por entrada debe ser positivo")
+            return None
+        
+        try:
+            clip = self._parse_clip(start_time, end_time)
+        except ValueError as e:
+            self.log_message(f"❌ Tramo inválido: {str(e)}")
+            return None
+        if clip and not yt_dlp.postprocessor.FFmpegPostProcessor().available:
+            self.log_message("❌ Para descargar solo un tramo hace falta ffmpeg")
+            return None
+        
+        # Validar los filtros antes de encolar
+        try:
+            self._build_filter_options(playlist_filters)
+        except ValueError as e:
+            self.log_message(f"❌ Filtro de playlist inválido: {str(e)}")
+            return None
+        
+        if download_path:
+            self.set_download_path(download_path)
+        
+        with self._job_lock:
+            self._job_counter += 1
+            job_id = f"job-{self._job_counter}"
+        
+        job = DownloadJob(
+            job_id=job_id,
+            url=url,
+            download_type=download_type,
+            quality=quality,
+            download_path=self.current_download_path,
+            priority=priority,
+            playlist_filters=playlist_filters,
+            check_space=check_space,
+            space_policy=space_policy,
+            target_time=target_time,
+            clip=clip
+        )
+        self.scheduler.submit(job)
+        
+        if job.status == "queued":
+            self.log_message(f"🕒 Descarga en cola ({job_id}, prioridad {priority})")
+        return job_id
+    
+    @property
+    def is_downloading(self) -> bool:
+        """
+        Indica si hay descargas en cola o en curso
+        """
+        return self.scheduler.has_active_jobs()
+    
+    def set_max_workers(self, max_workers: int):
+        """
+        Establece el número de descargas simultáneas
+        """
+        self.scheduler.set_max_workers(max_workers)
+        self.log_message(f"⚙️ Descargas simultáneas: {self.scheduler.max_workers}")
+    
+    def set_host_limit(self, limit: int, host: Optional[str] = None):
+        """
+        Establece el límite de descargas simultáneas por sitio
+        
+        Args:
+            limit: Número máximo de descargas simultáneas
+            host: Sitio concreto (p.ej. "youtube.com"); sin él se cambia el
+                límite por defecto de todos los sitios
+        """
+        self.scheduler.set_host_limit(host_key(f"//{host}") if host else None, limit)
+        self.log_message(f"⚙️ Descargas simultáneas por sitio{f' ({host})' if host else ''}: {limit}")
+    
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Obtiene el estado de la cola: posición, inicio estimado y progreso
+        agregado ('progress') de cada trabajo
+        """
+        return self.scheduler.get_jobs()
+    
+    def get_job_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el progreso agregado de un trabajo: entradas hechas y
+        pendientes, bytes descargados frente al total estimado, caudal medio
+        y tiempo restante
+        """
+        job = self.scheduler.get_job(job_id)
+        return job.progress.snapshot() if job else None
+    
+    def search_library(self, text: str = "", uploader: Optional[str] = None,
+                       limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Busca en la biblioteca de descargas por título o canal
+        
+        Returns:
+            Lista de filas con 'video_id', 'url', 'title', 'uploader',
+            'duration', 'format', 'size', 'path' y 'downloaded_at'
+        """
+        return self.catalog.search(text, uploader=uploader, limit=limit)
+    
+    def find_in_library(self, video_id: Optional[str] = None, url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Indica si un video ya se descargó (por id o por URL)
+        """
+        return self.catalog.find(video_id=video_id, url=url)
+    
+    def rescan_library(self, folders: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Actualiza la biblioteca con lo que hay en disco (por defecto en la
+        carpeta de descargas actual)
+        """
+        folders = folders or [self.current_download_path]
+        self.log_message(f"📚 Reexaminando biblioteca: {', '.join(folders)}")
+        stats = self.catalog.rescan(folders)
+        self.log_message(f"📚 Biblioteca actualizada: {stats['added']} nuevos, {stats['updated']} modificados, "
+                         f"{stats['removed']} eliminados, {stats['unchanged']} sin cambios")
+        return stats
+    
+    def get_queue_progress(self) -> Dict[str, Any]:
+        """
+        Obtiene el progreso agregado de toda la cola y la hora estimada de fin
+        """
+        return self.scheduler.get_summary()
+    
+    def stream_download(self, url: str, sink: Any, quality: str = "720p",
+                        buffer_size: int = 8 * 1024 * 1024, chunk_size: int = 256 * 1024) -> Dict[str, Any]:
+        """
+        Envía un video directamente a un consumidor, sin pasar por el disco
+        
+        Se resuelve el formato con yt-dlp y su contenido se lee por HTTP en
+        un hilo aparte, que lo deja en un búfer acotado; el hilo que llama
+        lo va entregando al consumidor. Si el consumidor es más lento, el
+        búfer se llena y la lectura de la red espera. El progreso se
+        notifica igual que en las descargas normales. No espera turno en la
+        cola de descargas, pero aparece en get_jobs y se puede detener con
+        cancel_download; se ejecuta siempre en este proceso.
+        
+        Args:
+            url: URL de un video individual
+            sink: Descriptor de archivo (p.ej. el extremo de escritura de una
+                tubería), objeto con write() o función que recibe cada
+                bloque de bytes
+            quality: Calidad deseada. Solo sirven formatos de un único
+                archivo por HTTP (no HLS/DASH ni video y audio por separado)
+            buffer_size: Bytes máximos en el búfer entre la red y el consumidor
+            chunk_size: Tamaño de cada bloque
+            
+        Returns:
+            Dict con 'job_id', 'title', 'format', 'bytes' y 'elapsed'
+            
+        Raises:
+            Exception: Si no hay un formato apto o falla la descarga o el consumidor
+        """
+        if isinstance(sink, int):
+            fd = sink
+            
+            def write(data):
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+        elif hasattr(sink, 'write'):
+            write = sink.write
+        elif callable(sink):
+            write = sink
+        else:
+            raise TypeError("el consumidor debe ser un descriptor, un objeto con write() o una función")
+        
+        # Bytes ya entregados: con ellos ya no se puede empezar de nuevo
+        sent = [0]
+        
+        def deliver(data):
+            write(data)
+            sent[0] += len(data)
+        
+        with self._job_lock:
+            self._job_counter += 1
+            job_id = f"stream-{self._job_counter}"
+        job = DownloadJob(job_id=job_id, url=url, download_type="single", quality=quality,
+                          download_path=self.current_download_path)
+        job.status = "running"
+        job.started_at = time.time()
+        self.scheduler.track(job)
+        previous_job_id = getattr(self._job_context, 'job_id', None)
+        self._job_context.job_id = job_id
+        
+        # Solo formatos de un archivo por HTTP: esos se pueden leer como un flujo
+        http_only = '[protocol^=http][protocol!*=dash]'
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'format': '/'.join(spec + http_only for spec in self._format_spec(quality).split('/')),
+        }
+        try:
+            self.log_message(f"📡 Enviando al consumidor ({job_id}): {url}")
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = self.manifests.get(url)
+                cached = info is not None
+                while True:
+                    if info is None:
+                        info = ydl.extract_info(url, download=False, process=False)
+                        self.manifests.put(url, info)
+                    info = ydl.process_ie_result(info, download=False)
+                    if info.get('_type') == 'playlist' or info.get('requested_formats'):
+                        raise Exception("solo se pueden enviar videos individuales de un único archivo")
+                    
+                    name = f"{info.get('title') or info.get('id')}.{info.get('ext')}"
+                    self.log_message(f"🎥 Formato: {info.get('format')}")
+                    try:
+                        delivered = self._stream_format(ydl, info, job, name, deliver,
+                                                        buffer_size, chunk_size)
+                        break
+                    except yt_dlp.networking.exceptions.HTTPError as e:
+                        # Enlaces del manifiesto en caché caducados: se vuelve a
+                        # resolver una vez, si aún no se ha entregado nada
+                        if not cached or sent[0] or e.status not in (403, 404, 410):
+                            raise
+                        self.manifests.invalidate(url)
+                        self.log_message("🔄 Los enlaces guardados han caducado: se vuelve a resolver")
+                        info, cached = None, False
+            
+            if hasattr(sink, 'flush'):
+                sink.flush()
+            job.status = "completed"
+            elapsed = time.time() - job.started_at
+            self.log_message(f"✅ Enviados {self._format_size(delivered)} en {elapsed:.1f}s ({job_id})")
+            return {'job_id': job_id, 'title': info.get('title'), 'format': info.get('format'),
+                    'bytes': delivered, 'elapsed': elapsed}
+        
+        except yt_dlp.utils.DownloadCancelled:
+            job.status = "cancelled"
+            self.log_message(f"⚠️ Envío cancelado ({job_id})")
+            raise
+        except Exception as e:
+            job.status = "error"
+            self.log_message(f"❌ Error al enviar al consumidor: {str(e)}")
+            raise
+        finally:
+            job.finished_at = time.time()
+            self._job_context.job_id = previous_job_id
+    
+    def _stream_format(self, ydl, info: Dict, job: DownloadJob, name: str, write: Callable,
+                       buffer_size: int, chunk_size: int) -> int:
+        """
+        Lee el formato elegido por HTTP en un hilo y lo entrega con write()
+        
+        Returns:
+            Bytes entregados
+        """
+        chunks = queue.Queue(maxsize=max(buffer_size // chunk_size, 1))
+        stop = threading.Event()
+        done = object()
+        total = [info.get('filesize') or info.get('filesize_approx')]
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def reader():
+            received = 0
+            attempt = 0
+            while not stop.is_set():
+                headers = dict(info.get('http_headers') or {})
+                if received:
+                    headers['Range'] = f'bytes={received}-'
+                try:
+                    response = ydl.urlopen(yt_dlp.networking.Request(info['url'], headers=headers))
+                    try:
+                        if received and response.status != 206:
+                            raise yt_dlp.utils.DownloadError("el servidor no permite continuar el envío")
+                        length = response.headers.get('Content-Length')
+                        if length and not received:
+                            total[0] = int(length)
+                        while not stop.is_set():
+                            data = response.read(chunk_size)
+                            if not data:
+                                put(done)
+                                return
+                            received += len(data)
+                            attempt = 0
+                            if not put(data):
+                                return
+                    finally:
+                        response.close()
+                except Exception as e:
+                    attempt += 1
+                    expired = (isinstance(e, yt_dlp.networking.exceptions.HTTPError)
+                               and e.status in (403, 404, 410) and not received)
+                    if (attempt >= self.max_attempts or expired
+                            or isinstance(e, yt_dlp.utils.DownloadError)):
+                        put(e)
+                        return
+                    self.log_message(f"⚠️ Conexión interrumpida ({e}); reanudando desde "
+                                     f"{self._format_size(received)}", job_id=job.job_id)
+                    stop.wait(self.retry_base_delay * attempt)
+        
+        thread = threading.Thread(target=reader, name=f"{job.job_id}-lectura", daemon=True)
+        thread.start()
+        start = time.time()
+        delivered = 0
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=0.5)
+                except queue.Empty:
+                    if job.cancelled:
+                        raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+                    continue
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                write(item)
+                delivered += len(item)
+                now = time.time()
+                self._progress_hook({
+                    'status': 'downloading',
+                    'filename': name,
+                    'downloaded_bytes': delivered,
+                    'total_bytes': total[0],
+                    'speed': HttpFD.calc_speed(start, now, delivered),
+                    'eta': HttpFD.calc_eta(start, now, total[0], delivered) if total[0] else None,
+                    'elapsed': now - start,
+                }, job)
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+        
+        self._progress_hook({
+            'status': 'finished',
+            'filename': name,
+            'downloaded_bytes': delivered,
+            'total_bytes': delivered,
+            'elapsed': time.time() - start,
+        }, job)
+        return delivered
+    
+    def _download_thread(self, job: DownloadJob):
+        """
+        Hilo de descarga de un trabajo (perfilado si está activado)
+        """
+        if self.worker_backend == "process":
+            self._run_in_process(job)
+            return
+        
+        if not self.profiling:
+            self._download_job(job)
+            return
+        
+        session = self._profile_session(job.job_id)
+        try:
+            with session:
+                self._download_job(job)
+        finally:
+            job.profile_report = str(session.report_path)
+            self._finish_profile_session(session, job.job_id)
+    
+    def _run_in_process(self, job: DownloadJob):
+        """
+        Ejecuta un trabajo en un proceso de trabajo
+        
+        El hilo sigue ocupando el hueco del trabajo en el planificador y
+        reenvía los mensajes y el progreso que llegan del proceso. La
+        cancelación se pasa al proceso; si no responde, se mata.
+        """
+        payload = {
+            'settings': self._worker_settings(),
+            'job': {
+                'job_id': job.job_id,
+                'url': job.url,
+                'download_type': job.download_type,
+                'quality': job.quality,
+                'download_path': job.download_path,
+                'priority': job.priority,
+                'playlist_filters': job.playlist_filters,
+                'check_space': job.check_space,
+                'space_policy': job.space_policy,
+                'target_time': job.target_time,
+                'clip': job.clip
+            }
+        }
+        try:
+            result = self.workers.run("download", payload,
+                                      lambda message: self._handle_worker_message(message, job),
+                                      job.cancel_event)
+        except yt_dlp.utils.DownloadCancelled as e:
+            job.status = "cancelled"
+            self.log_message(f"⚠️ Descarga cancelada ({job.job_id}): {e}", job_id=job.job_id)
+        except Exception as e:
+            job.status = "error"
+            error_msg = f"❌ Error durante la descarga: {str(e)}"
+            self.log_message(error_msg, job_id=job.job_id)
+            if self.progress_callback:
+                self.progress_callback("error", error_msg)
+        else:
+            job.status = result['status']
+            job.report = result['report']
+            job.profile_report = result['profile_report']
+            job.progress.remote = result['progress']
+            return
+        
+        # El proceso no llegó a avisar del final del trabajo
+        if self.progress_callback:
+            self.progress_callback("finished", {'job_id': job.job_id})
+    
+    def _handle_worker_message(self, message: tuple, job: Optional[DownloadJob] = None):
+        """
+        Atiende un mensaje de un proceso de trabajo
+        """
+        kind = message[0]
+        if kind == 'log':
+            self._show_message(message[1])
+        elif kind == 'activity':
+            _, level, text, job_id, fields = message
+            self.activity_log.write(level, text, job_id, **fields)
+        elif kind == 'progress':
+            _, status, data = message
+            if job is not None and isinstance(data, dict):
+                if 'overall' in data:
+                    job.progress.remote = data['overall']
+                if status == "profile":
+                    job.profile_report = data['path']
+            if self.progress_callback:
+                self.progress_callback(status, data)
+    
+    def _worker_settings(self) -> Dict[str, Any]:
+        """
+        Ajustes que se copian al VideoDownloader de cada proceso de trabajo
+        """
+        return {
+            'min_free_space': self.min_free_space,
+            'max_attempts': self.max_attempts,
+            'retry_base_delay': self.retry_base_delay,
+            'retry_max_delay': self.retry_max_delay,
+            'segment_connections': self.segment_connections,
+            'adaptive_target_time': self.adaptive_target_time,
+            'profiling': self.profiling,
+            'profile_dir': self.profile_dir
+        }
+    
+    def _download_job(self, job: DownloadJob):
+        """
+        Descarga un trabajo
+        
+        Las playlists se enumeran primero (aplicando los filtros) y después
+        cada entrada se descarga por separado a través del motor de
+        reintentos, de modo que un fallo no se pierde en silencio.
+        """
+        url = job.url
+        download_type = job.download_type
+        playlist_filters = job.playlist_filters
+        self._job_context.job_id = job.job_id
+        try:
+            self.log_message(f"🚀 Iniciando descarga ({job.job_id})...")
+            self.log_message(f"📎 URL: {url}")
+            type_labels = {
+                'single': 'Video individual',
+                'playlist': 'Playlist completa',
+                'sync': 'Sincronización incremental'
+            }
+            self.log_message(f"📥 Tipo: {type_labels.get(download_type, download_type)}")
+            if job.quality == "Adaptativa":
+                self.log_message(f"🎥 Calidad: adaptativa (objetivo "
+                                 f"{job.target_time or self.adaptive_target_time:.0f}s por entrada)")
+            else:
+                self.log_message(f"🎥 Calidad: {job.quality}")
+            if job.clip:
+                start, end = job.clip
+                self.log_message(f"✂️ Tramo: {self._format_clock(start)} - "
+                                 f"{self._format_clock(end) if end is not None else 'final'}")
+            if download_type in ("playlist", "sync") and playlist_filters:
+                active = {k: v for k, v in playlist_filters.items() if v not in (None, '')}
+                if active:
+                    self.log_message(f"🔎 Filtros: {', '.join(f'{k}={v}' for k, v in active.items())}")
+            self.log_message(f"📁 Guardando en: {job.download_path}")
+            self.log_message("-" * 50)
+            
+            if download_type == "sync":
+                known = self._count_sync_entries(url)
+                self.log_message(f"🔄 Videos ya sincronizados: {known}")
+                if not self._sync_is_clean(url):
+                    self.log_message("🔄 La última sincronización no terminó limpia: "
+                                     "se repasa la lista completa")
+            
+            ydl_opts = self._get_ydl_options(job)
+            enum_opts = self._get_enumeration_options(job)
+            
+            if job.check_space:
+                allowed_items = self._preflight_space_check(job, {**ydl_opts, **enum_opts})
+                if allowed_items is False:
+                    raise Exception("espacio en disco insuficiente para la descarga completa")
+                if allowed_items is not None:
+                    enum_opts['playlist_items'] = allowed_items
+            
+            # Los filtros se vuelven a comprobar con cada entrada ya resuelta:
+            # la lista plana no trae la fecha de subida y a veces tampoco la duración
+            filter_opts = {}
+            if download_type in ("playlist", "sync"):
+                filter_opts = self._build_filter_options(playlist_filters)
+                filter_opts.pop('playlist_items', None)
+            ydl_opts.update(filter_opts)
+            
+            # Control de admisión: antes de descargar cada entrada se comprueba
+            # el espacio libre y si hay que ceder el hueco a otro trabajo
+            ydl_opts['match_filter'] = self._chain_match_filters(
+                filter_opts.get('match_filter'),
+                lambda info_dict, incomplete=False: self._admission_filter(job, info_dict, incomplete))
+            
+            if download_type == "single":
+                entries = [{'url': url, 'title': url, 'ie_key': None, 'extra': None, 'info': None}]
+                job.progress.set_entries(1)
+            else:
+                # Las entradas se descargan según se van listando
+                entries = self._stream_entries(job, enum_opts)
+            
+            job.report = self._download_entries(job, entries, ydl_opts)
+            
+            if job.cancelled:
+                raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+            
+            if download_type == "sync":
+                new_entries = self._count_sync_entries(url) - known
+                self.log_message(f"🔄 Sincronización terminada: {new_entries} videos nuevos")
+            
+            if job.report['failed'] and not job.report['succeeded']:
+                raise Exception(job.report['failed'][0][1])
+            
+            if job.space_exhausted:
+                # Terminó sin errores pero dejó entradas sin bajar
+                job.status = "incomplete"
+                self.log_message(f"⚠️ Descarga incompleta: se dejaron de admitir entradas por falta "
+                                 f"de espacio en disco ({job.job_id})")
+            else:
+                job.status = "completed"
+                self.log_message(f"✅ ¡Descarga completada exitosamente! ({job.job_id})")
+            self.log_message(f"📁 Archivos guardados en: {job.download_path}")
+            
+            if self.progress_callback:
+                self.progress_callback(job.status, {'job_id': job.job_id})
+                
+        except yt_dlp.utils.DownloadCancelled:
+            job.status = "cancelled"
+            self.log_message(f"⚠️ Descarga cancelada ({job.job_id})")
+            
+        except Exception as e:
+            job.status = "error"
+            error_msg = f"❌ Error durante la descarga: {str(e)}"
+            self.log_message(error_msg)
+            
+            if self.progress_callback:
+                self.progress_callback("error", error_msg)
+        
+        finally:
+            if download_type == "sync":
+                # Solo una sincronización sin huecos permite cortar el listado
+                # en el primer video ya registrado la próxima vez
+                clean = (job.status == "completed" and not job.report['failed']
+                         and not job.enumeration_interrupted)
+                self._update_sync_index(url, clean)
+            
+            # Resumen estructurado del trabajo, solo para el registro en disco
+            report = job.report or {}
+            self.activity_log.write(
+                "error" if job.status == "error" else "info", "trabajo terminado", job.job_id,
+                status=job.status, url=url, download_type=download_type,
+                succeeded=report.get('succeeded', 0), skipped=len(report.get('skipped', [])),
+                failed=len(report.get('failed', [])),
+                elapsed=round(time.time() - job.started_at, 1) if job.started_at else None
+            )
+            self._job_context.job_id = None
+            
+            if self.progress_callback:
+                self.progress_callback("finished", {'job_id': job.job_id})
+    
+    def _enumerate_entries(self, job: DownloadJob, enum_opts: Dict,
+                           on_entry: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Lista las entradas de una playlist que pasan los filtros, sin resolverlas
+        
+        Args:
+            on_entry: Función a la que se pasa cada entrada en cuanto se
+                encuentra, sin esperar a que termine el listado
+        
+        Returns:
+            Lista de entradas con 'url', 'title', 'ie_key' y 'extra' (campos
+            de la playlist que se pasan a yt-dlp al descargar la entrada)
+        """
+        entries = {}
+        
+        def _collect(info_dict: Dict, incomplete: bool = False) -> Optional[str]:
+            # yt-dlp solo llega aquí si la entrada ha pasado el resto de filtros
+            if incomplete and info_dict.get('_type', 'video') != 'playlist' and info_dict.get('playlist_index'):
+                if info_dict['playlist_index'] not in entries:
+                    entry = entries[info_dict['playlist_index']] = self._make_job_entry(info_dict)
+                    if on_entry:
+                        on_entry(entry)
+            return None
+        
+        enum_opts = dict(enum_opts)
+        enum_opts['match_filter'] = self._chain_match_filters(enum_opts.get('match_filter'), _collect)
+        
+        try:
+            with yt_dlp.YoutubeDL(enum_opts) as ydl:
+                info = ydl.extract_info(job.url, download=False)
+            
+            if info is None:
+                raise Exception("no se pudieron listar las entradas de la URL")
+            
+            if 'entries' not in info and info.get('_type', 'video') == 'video':
+                # La URL es un video suelto: se descarga como única entrada
+                self.log_message("ℹ️ La URL no es una playlist: se descarga el video como única entrada")
+                title = info.get('title') or info.get('id')
+                entries[1] = {'url': job.url, 'title': title or job.url, 'ie_key': None, 'info': None,
+                              'extra': {'playlist_index': 1, 'playlist': title, 'playlist_title': title}}
+                if on_entry:
+                    on_entry(entries[1])
+            
+            # Entradas que yt-dlp no pasa por los filtros durante la enumeración
+            playlist_entries = info.get('entries') or []
+            indices = info.get('requested_entries') or range(1, len(playlist_entries) + 1)
+            for index, entry in zip(indices, playlist_entries):
+                if entry and index not in entries:
+                    entry.setdefault('playlist_index', index)
+                    entry.setdefault('playlist', info.get('title'))
+                    entry.setdefault('playlist_title', info.get('title'))
+                    entry.setdefault('playlist_id', info.get('id'))
+                    entries[index] = self._make_job_entry(entry)
+                    if on_entry:
+                        on_entry(entries[index])
+        except yt_dlp.utils.ExistingVideoReached:
+            # Sincronización: se ha llegado al primer video ya descargado
+            self.log_message("🔄 Alcanzado el último video sincronizado")
+        
+        return [entries[index] for index in sorted(entries)]
+    
+    def _stream_entries(self, job: DownloadJob, enum_opts: Dict) -> Iterator[Dict[str, Any]]:
+        """
+        Entrega las entradas de una playlist según se van listando
+        
+        La enumeración corre en un hilo aparte con lazy_playlist, de modo que
+        cada entrada llega a la descarga en cuanto yt-dlp la recibe del sitio
+        y los primeros archivos terminan antes de que acabe el listado. El
+        total de entradas del progreso crece a medida que aparecen.
+        """
+        found = queue.Queue()
+        done = object()
+        stop = threading.Event()
+        count = 0
+        
+        def _on_entry(entry: Dict[str, Any]):
+            if stop.is_set() or job.cancelled:
+                # La descarga ya terminó o se canceló: se deja de listar
+                raise yt_dlp.utils.DownloadCancelled("enumeración interrumpida")
+            found.put(entry)
+        
+        def _producer():
+            self._job_context.job_id = job.job_id
+            try:
+                self._enumerate_entries(job, {**enum_opts, 'lazy_playlist': True}, _on_entry)
+                found.put(done)
+            except yt_dlp.utils.DownloadCancelled:
+                found.put(done)
+            except Exception as e:
+                found.put(e)
+        
+        job.enumerating = True
+        threading.Thread(target=_producer, daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = found.get(timeout=0.5)
+                except queue.Empty:
+                    if job.cancelled:
+                        raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+                    continue
+                
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    if not count:
+                        raise item
+                    self.log_message(f"⚠️ El listado de la playlist se interrumpió: {item}")
+                    job.enumeration_interrupted = True
+                    break
+                count += 1
+                job.progress.set_entries(count)
+                yield item
+        finally:
+            stop.set()
+            job.enumerating = False
+        
+        job.progress.set_entries(count)
+        self.log_message(f"📋 Entradas a descargar: {count}")
+    
+    @staticmethod
+    def _make_job_entry(info_dict) -> Dict[str, Any]:
+        """
+        Reduce una entrada de yt-dlp a lo necesario para descargarla
+        
+        Las entradas planas (solo URL) se resolverán al descargarlas; las que
+        el extractor ya entrega resueltas se conservan tal cual.
+        """
+        extra = {
+            key: info_dict.get(key)
+            for key in ('playlist', 'playlist_title', 'playlist_id', 'playlist_index', 'n_entries')
+            if info_dict.get(key) is not None
+        }
+        entry = {
+            'url': info_dict.get('url') or info_dict.get('webpage_url'),
+            'title': info_dict.get('title') or info_dict.get('id') or info_dict.get('url'),
+            'ie_key': info_dict.get('ie_key'),
+            'extra': extra,
+            'info': None
+        }
+        if info_dict.get('_type', 'video') not in ('url', 'url_transparent'):
+            own = info_dict.maps[0] if isinstance(info_dict, collections.ChainMap) else info_dict
+            entry['info'] = dict(own)
+            entry['url'] = info_dict.get('webpage_url') or info_dict.get('original_url') or entry['url']
+        return entry
+    
+    def _download_entries(self, job: DownloadJob, entries: Iterator[Dict], ydl_opts: Dict) -> Dict[str, Any]:
+        """
+        Descarga las entradas con reintentos y una pasada final sobre las fallidas
+        
+        Las entradas pueden llegar de una lista o de _stream_entries, mientras
+        la playlist se sigue listando.
+        
+        Returns:
+            Informe con 'succeeded', 'recovered' (títulos que fallaron al
+            menos una vez pero acabaron bajando), 'skipped' (lista de
+            (título, motivo) de las descartadas sin error) y 'failed' (lista
+            de (título, error))
+        """
+        # Un único YoutubeDL por trabajo, reutilizado para todas las entradas
+        with SegmentedYoutubeDL(ydl_opts) as ydl:
+            ydl.add_post_processor(CatalogPostProcessor(self.catalog), when='after_move')
+            succeeded = 0
+            recovered = []
+            skipped = []
+            pending = []
+            
+            for position, entry in enumerate(entries, 1):
+                if job.cancelled:
+                    raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+                if job.download_type != "single":
+                    known = job.progress.entries_total
+                    self.log_message(f"🎬 [{position}/{known}{'+' if job.enumerating else ''}] {entry['title']}")
+                
+                result, attempts, error = self._download_entry_with_retries(ydl, job, entry)
+                job.progress.finish_entry(result in ("ok", "skipped"))
+                if result == "ok":
+                    succeeded += 1
+                    if attempts > 1:
+                        recovered.append(entry['title'])
+                elif result == "skipped":
+                    skipped.append((entry['title'], error))
+                else:
+                    pending.append((entry, result, error))
+            
+            # Pasada final: se reintentan las entradas fallidas o aplazadas por el
+            # cortocircuito (en un video individual no compensa esperar al host)
+            failed = []
+            if job.download_type == "single":
+                failed = [(entry['title'], error) for entry, _, error in pending]
+                pending = []
+            retryable = [item for item in pending if item[1] in ("failed", "deferred")]
+            if retryable and not job.cancelled:
+                self.log_message(f"🔁 Pasada final de reintentos: {len(retryable)} entradas")
+            
+            for entry, result, error in pending:
+                if job.cancelled:
+                    raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+                if result not in ("failed", "deferred"):
+                    failed.append((entry['title'], error))
+                    continue
+                
+                host = host_key(entry['url'] or job.url)
+                wait = self.circuit_breaker.retry_after(host)
+                if wait:
+                    self.log_message(f"⏳ Esperando {wait:.0f}s a que {host} se recupere...")
+                    if job.cancel_event.wait(wait):
+                        raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+                
+                result, _, error = self._download_entry_with_retries(ydl, job, entry)
+                job.progress.finish_entry(result in ("ok", "skipped"), counted=False)
+                if result == "ok":
+                    succeeded += 1
+                    recovered.append(entry['title'])
+                elif result == "skipped":
+                    skipped.append((entry['title'], error))
+                else:
+                    failed.append((entry['title'], error))
+        
+        report = {'succeeded': succeeded, 'recovered': recovered, 'skipped': skipped, 'failed': failed}
+        self._log_download_report(job, report)
+        return report
+    
+    def _download_entry_with_retries(self, ydl, job: DownloadJob, entry: Dict):
+        """
+        Descarga una entrada con backoff exponencial y jitter
+        
+        Returns:
+            Tupla (resultado, intentos, error). El resultado es "ok",
+            "skipped" (descartada por los filtros o por falta de espacio; el
+            error lleva el motivo), "failed" (fallo reintentable),
+            "permanent" (fallo que no se arregla reintentando) o "deferred"
+            (host con el circuito abierto)
+        """
+        host = host_key(entry['url'] or job.url)
+        error = None
+        
+        for attempt in range(1, self.max_attempts + 1):
+            if job.cancelled:
+                raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+            if not self.circuit_breaker.allow(host):
+                self.log_message(f"⛔ {host} en enfriamiento: se aplaza \"{entry['title']}\"")
+                return "deferred", attempt, error or f"{host} no disponible temporalmente"
+            
+            try:
+                if entry.get('info'):
+                    # Entrada ya resuelta por el extractor de la playlist
+                    info = ydl.process_ie_result(copy.deepcopy(entry['info']), download=True,
+                                                 extra_info=entry.get('extra'))
+                else:
+                    info = self._resolve_and_download(ydl, entry)
+                self.circuit_breaker.record_success(host)
+                if not self._was_downloaded(info):
+                    # yt-dlp la descartó sin error (filtros, espacio o archivo de sincronización)
+                    reason = ("espacio en disco agotado" if job.space_exhausted
+                              else "excluida por los filtros o ya registrada")
+                    return "skipped", attempt, reason
+                return "ok", attempt, None
+                
+            except yt_dlp.utils.DownloadCancelled:
+                raise
+            except Exception as e:
+                # Mensaje sin el prefijo "ERROR:" ni retornos de carro de yt-dlp
+                error = re.sub(r'^ERROR:\s*', '', str(e).replace('\r', '')).strip()
+                if not self._is_retryable(e):
+                    self.log_message(f"❌ Error definitivo en \"{entry['title']}\": {error}")
+                    return "permanent", attempt, error
+                
+                if self.circuit_breaker.record_failure(host):
+                    self.log_message(f"⛔ Demasiados fallos seguidos en {host}: "
+                                     f"pausa de {self.circuit_breaker.cooldown:.0f}s")
+                
+                if attempt < self.max_attempts:
+                    delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+                    delay *= random.uniform(0.5, 1.5)
+                    self.log_message(f"⚠️ Intento {attempt}/{self.max_attempts} fallido "
+                                     f"({error}); reintentando en {delay:.1f}s")
+                    if job.cancel_event.wait(delay):
+                        raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+        
+        return "failed", self.max_attempts, error
+    
+    def _resolve_and_download(self, ydl, entry: Dict) -> Optional[Dict]:
+        """
+        Descarga una entrada reutilizando su manifiesto en caché si lo hay
+        
+        Si los enlaces guardados resultan haber caducado (el servidor los
+        rechaza), se descarta el manifiesto y se vuelve a resolver la
+        entrada en el acto, sin gastar un intento.
+        """
+        url = entry['url']
+        info = self.manifests.get(url)
+        if info is not None:
+            self.log_message(f"♻️ Formatos en caché para \"{entry['title']}\"")
+            try:
+                return ydl.process_ie_result(info, download=True, extra_info=entry.get('extra'))
+            except yt_dlp.utils.DownloadError as e:
+                if not re.search(r'HTTP Error (403|404|410)', str(e)):
+                    raise
+                self.manifests.invalidate(url)
+                self.log_message("🔄 Los enlaces guardados han caducado: se vuelve a resolver")
+        
+        info = ydl.extract_info(url, ie_key=entry.get('ie_key'), download=False, process=False)
+        self.manifests.put(url, info)
+        return ydl.process_ie_result(info, download=True, extra_info=entry.get('extra'))
+    
+    @staticmethod
+    def _was_downloaded(info: Optional[Dict]) -> bool:
+        """
+        Indica si yt-dlp llegó a guardar algún archivo para una entrada
+        
+        Las entradas que descarta un filtro (match_filter, fechas, título o
+        archivo de sincronización) vuelven sin error pero sin 'filepath'.
+        """
+        return bool(info) and any(download.get('filepath')
+                                  for download in info.get('requested_downloads') or [])
     
-    def log_message(self, message: str):
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
         """
-        Registra un mensaje usando el callback si está disponible
+        Indica si merece la pena reintentar tras un error
         """
-        if self.log_callback:
-            self.log_callback(message)
-        else:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+        cause = getattr(error, 'exc_info', None)
+        cause = cause[1] if cause else error
+        if isinstance(cause, yt_dlp.utils.UnsupportedError):
+            return False
+        text = str(error).lower()
+        return not any(fragment in text for fragment in PERMANENT_ERRORS)
     
-    def set_download_path(self, path: str):
+    def _log_download_report(self, job: DownloadJob, report: Dict[str, Any]):
         """
-        Establece la carpeta de descarga
+        Registra el informe final de una descarga
         """
-        self.current_download_path = path
-        Path(path).mkdir(exist_ok=True)
-        self.log_message(f"📁 Carpeta de descarga cambiada a: {path}")
+        if not report['recovered'] and not report['failed'] and not report['skipped']:
+            return
+        
+        self.log_message("=" * 50)
+        self.log_message(f"📊 INFORME DE DESCARGA ({job.job_id})")
+        self.log_message("=" * 50)
+        self.log_message(f"✅ Descargadas: {report['succeeded']}")
+        if report['recovered']:
+            self.log_message(f"🔁 Recuperadas tras reintentar: {len(report['recovered'])}")
+            for title in report['recovered']:
+                self.log_message(f"   • {title}")
+        if report['skipped']:
+            self.log_message(f"⏭️ Omitidas: {len(report['skipped'])}")
+            for title, reason in report['skipped']:
+                self.log_message(f"   • {title}: {reason}")
+        if report['failed']:
+            self.log_message(f"❌ Fallidas definitivamente: {len(report['failed'])}")
+            for title, error in report['failed']:
+                self.log_message(f"   • {title}: {error}")
+        
+        if self.progress_callback:
+            self.progress_callback("report", {'job_id': job.job_id, **report})
     
-    def get_video_info(self, url: str) -> Dict[str, Any]:
+    def _get_ydl_options(self, job: DownloadJob) -> Dict:
         """
-        Obtiene información de un video o playlist sin descargarlo
-        
-        Args:
-            url: URL del video o playlist
-            
-        Returns:
-            Dict con la información extraída
+        Configura las opciones de yt-dlp para descargar cada entrada
         """
-        try:
-            self.log_message("🔍 Obteniendo información...")
-            
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
+        # El id entre corchetes permite reconocer el video al reexaminar la
+        # carpeta (LibraryCatalog._identify) sin escribir el .info.json
+        ydl_opts = {
+            'outtmpl': str(Path(job.download_path) / '%(title)s [%(id)s].%(ext)s'),
+            'writeinfojson': False,
+            'writeautomaticsub': False,
+            # Los errores se propagan para que los gestione el motor de reintentos
+            'ignoreerrors': False,
+            'noplaylist': True,
+        }
+        
+        # Configurar formato según calidad
+        if job.quality == "Adaptativa":
+            # Se elige el formato de cada entrada según el caudal medido
+            clip_seconds = job.clip[1] - job.clip[0] if job.clip and job.clip[1] is not None else None
+            job.adaptive = AdaptiveQuality(job.target_time or self.adaptive_target_time,
+                                           clip_seconds=clip_seconds)
+            ydl_opts['format'] = job.adaptive
+        else:
+            ydl_opts['format'] = self._format_spec(job.quality)
+        
+        # Plantillas de nombre para playlist (los campos de la playlist llegan
+        # a cada entrada desde la enumeración)
+        if job.download_type == "playlist":
+            ydl_opts['outtmpl'] = str(Path(job.download_path) / 
+                                    '%(playlist_title)s/%(playlist_index)02d - %(title)s [%(id)s].%(ext)s')
+        elif job.download_type == "sync":
+            ydl_opts['outtmpl'] = str(Path(job.download_path) / 
+                                    '%(playlist_title)s/%(upload_date)s - %(title)s [%(id)s].%(ext)s')
+            # Cada entrada descargada queda registrada como ya vista
+            ydl_opts['download_archive'] = str(self._get_sync_archive_path(job.url))
+        
+        # Tramo: ffmpeg pide solo los bytes o fragmentos del tramo (corte en
+        # el fotograma clave más cercano, sin recodificar)
+        if job.clip:
+            start, end = job.clip
+            ydl_opts['download_ranges'] = yt_dlp.utils.download_range_func(
+                None, [(start, end if end is not None else float('inf'))])
+            ydl_opts['outtmpl'] = ydl_opts['outtmpl'].replace(
+                '.%(ext)s', ' [%(section_start)d-%(section_end&{:.0f}|fin)s].%(ext)s')
+        
+        # Descarga por segmentos de los archivos progresivos
+        if self.segment_connections > 1:
+            ydl_opts['segmented_download'] = {
+                'connections': self.segment_connections,
+                'min_size': 8 * 1024 * 1024
             }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                if 'entries' in info:  # Es una playlist
-                    return self._process_playlist_info(info)
-                else:  # Es un video individual
-                    return self._process_video_info(info)
-                    
-        except Exception as e:
-            error_msg = f"❌ Error al obtener información: {str(e)}"
-            self.log_message(error_msg)
-            raise Exception(error_msg)
+        
+        # Hook de progreso
+        ydl_opts['progress_hooks'] = [lambda d: self._progress_hook(d, job)]
+        
+        return ydl_opts
     
-    def _process_video_info(self, info: Dict) -> Dict[str, Any]:
+    @staticmethod
+    def _format_spec(quality: str) -> str:
         """
-        Procesa información de un video individual
+        Selector de formato de yt-dlp para una calidad fija
         """
-        processed_info = {
-            'type': 'video',
-            'title': info.get('title', 'Sin título'),
-            'uploader': info.get('uploader', 'Desconocido'),
-            'duration': info.get('duration', 0),
-            'view_count': info.get('view_count', 'N/A'),
-            'upload_date': info.get('upload_date', 'Desconocida'),
-            'formats': []
+        format_mapping = {
+            "480p": 'best[height<=480]',
+            "720p": 'best[height<=720]',
+            "1080p": 'best[height<=1080]',
+            "Mejor disponible": 'best',
+            "Audio únicamente": 'bestaudio/best'
         }
-        
-        # Extraer formatos disponibles
-        if 'formats' in info:
-            formats_seen = set()
-            for fmt in info['formats']:
-                if fmt.get('height') and fmt.get('vcodec') != 'none':  # Filtrar solo video
-                    quality = f"{fmt['height']}p"
-                    if quality not in formats_seen:
-                        processed_info['formats'].append(quality)
-                        formats_seen.add(quality)
-            
-            # Ordenar calidades de menor a mayor
-            quality_order = {'480p': 480, '720p': 720, '1080p': 1080, '1440p': 1440, '2160p': 2160}
-            processed_info['formats'].sort(key=lambda x: quality_order.get(x, int(x.replace('p', ''))))
-        
-        self._log_video_info(processed_info)
-        return processed_info
+        return format_mapping.get(quality, 'best[height<=720]')
     
-    def _process_playlist_info(self, info: Dict) -> Dict[str, Any]:
+    def _get_enumeration_options(self, job: DownloadJob) -> Dict:
         """
-        Procesa información de una playlist
+        Configura las opciones de yt-dlp para listar las entradas de una playlist
         """
-        entries = info.get('entries', [])
-        videos = []
+        enum_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'ignoreerrors': True,
+            'noplaylist': job.download_type == "single",
+            # Solo se listan las entradas, sin resolver cada video
+            'extract_flat': 'in_playlist',
+        }
         
-        for i, entry in enumerate(entries, 1):
-            if entry:
-                video_info = {
-                    'index': i,
-                    'title': entry.get('title', f'Video {i}'),
-                    'duration': entry.get('duration', 0)
-                }
-                videos.append(video_info)
+        # Los filtros se evalúan al enumerar la playlist, antes de resolver cada entrada
+        if job.download_type in ("playlist", "sync"):
+            enum_opts.update(self._build_filter_options(job.playlist_filters))
         
-        processed_info = {
-            'type': 'playlist',
-            'title': info.get('title', 'Sin título'),
-            'uploader': info.get('uploader', 'Desconocido'),
-            'total_videos': len(videos),
-            'videos': videos
-        }
+        if job.download_type == "sync":
+            # Los canales se listan del más nuevo al más antiguo: al llegar al
+            # primer video ya registrado se deja de enumerar, salvo que la
+            # última sincronización dejara entradas sin bajar (fallos,
+            # cancelación o falta de espacio), que pueden ser más antiguas
+            enum_opts.update({
+                'download_archive': str(self._get_sync_archive_path(job.url)),
+                'break_on_existing': self._sync_is_clean(job.url),
+                'lazy_playlist': True,
+            })
         
-        self._log_playlist_info(processed_info)
-        return processed_info
+        return enum_opts
     
-    def _log_video_info(self, info: Dict):
+    @staticmethod
+    def _chain_match_filters(*filters: Optional[Callable]) -> Callable:
         """
-        Registra información de un video
+        Combina varios match_filter de yt-dlp: se rechaza la entrada con el primer motivo
         """
-        self.log_message("=" * 50)
-        self.log_message("📺 INFORMACIÓN DEL VIDEO")
-        self.log_message("=" * 50)
+        active = [f for f in filters if f]
         
-        self.log_message(f"🎬 Título: {info['title']}")
-        self.log_message(f"👤 Canal: {info['uploader']}")
-        self.log_message(f"📅 Fecha de subida: {info['upload_date']}")
+        def _match(info_dict: Dict, incomplete: bool = False) -> Optional[str]:
+            for match_filter in active:
+                reason = match_filter(info_dict, incomplete=incomplete)
+                if reason is not None:
+                    return reason
+            return None
+        return _match
+    
+    def _admission_filter(self, job: DownloadJob, info_dict: Dict,
+                          incomplete: bool = False) -> Optional[str]:
+        """
+        Decide si se admite la siguiente entrada de un trabajo
         
-        if info['duration']:
-            minutos = info['duration'] // 60
-            segundos = info['duration'] % 60
-            self.log_message(f"⏱️ Duración: {minutos}:{segundos:02d}")
+        yt-dlp llama a este filtro con incomplete=False justo antes de
+        descargar cada entrada, ya con el formato elegido. Es el punto entre
+        entradas en el que el trabajo cede su hueco a otros más prioritarios
+        y en el que se comprueba que quede espacio suficiente.
+        """
+        if incomplete:
+            # Llamada previa a la elección de formato: el selector adaptativo
+            # necesita la duración para estimar el tamaño por bitrate
+            if job.adaptive:
+                job.adaptive.duration = info_dict.get('duration')
+            return None
         
-        self.log_message(f"👀 Visualizaciones: {info['view_count']}")
+        self.scheduler.yield_slot(job)
+        if job.cancelled:
+            raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
         
-        if info['formats']:
-            self.log_message("🎥 Calidades disponibles:")
-            for quality in info['formats']:
-                self.log_message(f"   • {quality}")
+        if job.space_exhausted:
+            return "descarga omitida: espacio en disco agotado"
+        
+        free = shutil.disk_usage(job.download_path).free
+        needed = self._estimate_entry_size(info_dict) or 0
+        if free - needed < self.min_free_space:
+            job.space_exhausted = True
+            self.log_message(f"⚠️ Espacio insuficiente ({self._format_size(free)} libres): "
+                             f"no se admiten más entradas")
+            return "descarga omitida: espacio en disco insuficiente"
+        
+        if job.adaptive and job.adaptive.choice and job.adaptive.choice['label'] != job.adaptive.reported:
+            choice = job.adaptive.choice
+            details = []
+            if choice['size']:
+                details.append(f"~{self._format_size(choice['size'])}")
+            if choice['speed']:
+                details.append(f"a {self._format_size(choice['speed'])}/s")
+            self.log_message(f"📶 Calidad adaptativa: {choice['label']}"
+                             + (f" ({' '.join(details)})" if details else ""))
+            job.adaptive.reported = choice['label']
+        return None
     
-    def _log_playlist_info(self, info: Dict):
+    @staticmethod
+    def _estimate_entry_size(info_dict: Dict) -> Optional[int]:
         """
-        Registra información de una playlist
+        Estima el tamaño en bytes del formato elegido para una entrada
         """
-        self.log_message("=" * 50)
-        self.log_message("📋 INFORMACIÓN DE LA PLAYLIST")
-        self.log_message("=" * 50)
-        
-        self.log_message(f"📋 Título de la playlist: {info['title']}")
-        self.log_message(f"👤 Canal: {info['uploader']}")
-        self.log_message(f"🎥 Total de videos: {info['total_videos']}")
-        self.log_message("")
-        
-        self.log_message("📝 Lista de videos:")
-        for video in info['videos'][:10]:  # Solo primeros 10
-            duration_str = ""
-            if video['duration']:
-                minutos = video['duration'] // 60
-                segundos = video['duration'] % 60
-                duration_str = f" ({minutos}:{segundos:02d})"
-            
-            self.log_message(f"   {video['index']:2d}. {video['title']}{duration_str}")
+        formats = info_dict.get('requested_formats') or [info_dict]
+        total = 0
+        for fmt in formats:
+            size = fmt.get('filesize') or fmt.get('filesize_approx')
+            if not size and fmt.get('tbr') and info_dict.get('duration'):
+                # tbr está en kbit/s
+                size = fmt['tbr'] * 1000 / 8 * info_dict['duration']
+            if not size:
+                return None
+            total += size
         
-        if info['total_videos'] > 10:
-            self.log_message(f"   ... y {info['total_videos'] - 10} videos más")
+        # Tramo: solo cuenta la parte proporcional del archivo
+        duration = info_dict.get('duration')
+        if duration and (info_dict.get('section_start') or info_dict.get('section_end')):
+            end = min(info_dict.get('section_end') or duration, duration)
+            total *= max(end - (info_dict.get('section_start') or 0), 0) / duration
+        return int(total)
     
-    def start_download(self, url: str, download_type: str = "single", 
-                      quality: str = "720p", download_path: Optional[str] = None) -> bool:
+    def estimate_download_size(self, url: str, ydl_opts: Dict) -> Dict[str, Any]:
         """
-        Inicia una descarga
+        Estima el tamaño de una descarga sin descargar nada
+        
+        Resuelve cada entrada con el mismo formato y filtros que la descarga
+        real y suma filesize/filesize_approx del formato elegido.
         
         Args:
             url: URL del video o playlist
-            download_type: "single" o "playlist"
-            quality: Calidad deseada
-            download_path: Carpeta de descarga (opcional)
+            ydl_opts: Opciones de yt-dlp de la descarga
             
         Returns:
-            True si la descarga se inició correctamente
+            Dict con 'total_bytes', 'entries' (lista de (índice, bytes)) y
+            'unknown' (entradas sin tamaño conocido)
         """
-        if self.is_downloading:
-            self.log_message("⚠️ Ya hay una descarga en progreso")
-            return False
+        entries = []
+        unknown = 0
         
-        if not url.strip():
-            self.log_message("❌ URL vacía")
+        def _collect(info_dict: Dict, incomplete: bool = False) -> Optional[str]:
+            nonlocal unknown
+            if not incomplete:
+                size = self._estimate_entry_size(info_dict)
+                if size is None:
+                    unknown += 1
+                entries.append((info_dict.get('playlist_index') or 1, size or 0))
+            return None
+        
+        estimate_opts = {
+            key: value for key, value in ydl_opts.items()
+            if key not in ('progress_hooks', 'download_archive', 'break_on_existing')
+        }
+        estimate_opts.update({
+            'quiet': True,
+            'no_warnings': True,
+            'simulate': True,
+            # No se conservan las entradas ya resueltas en memoria
+            'extract_flat': 'discard_in_playlist',
+            'match_filter': self._chain_match_filters(
+                ydl_opts.get('match_filter'), _collect),
+        })
+        if ydl_opts.get('download_archive'):
+            # En sincronización solo cuentan las entradas nuevas
+            estimate_opts['download_archive'] = ydl_opts['download_archive']
+            estimate_opts['break_on_existing'] = ydl_opts.get('break_on_existing', True)
+        
+        with yt_dlp.YoutubeDL(estimate_opts) as ydl:
+            ydl.download([url])
+        
+        return {
+            'total_bytes': sum(size for _, size in entries),
+            'entries': entries,
+            'unknown': unknown
+        }
+    
+    def _preflight_space_check(self, job: DownloadJob, ydl_opts: Dict):
+        """
+        Compara el tamaño estimado con el espacio libre antes de empezar
+        
+        Returns:
+            None si la descarga cabe completa, False si debe rechazarse o la
+            especificación playlist_items con las entradas que caben
+        """
+        self.log_message("📏 Estimando tamaño de la descarga...")
+        estimate = self.estimate_download_size(job.url, ydl_opts)
+        free = shutil.disk_usage(job.download_path).free
+        available = free - self.min_free_space
+        
+        self.log_message(f"📏 Tamaño estimado: {self._format_size(estimate['total_bytes'])} "
+                         f"en {len(estimate['entries'])} entradas "
+                         f"(espacio libre: {self._format_size(free)})")
+        if estimate['unknown']:
+            self.log_message(f"⚠️ {estimate['unknown']} entradas sin tamaño conocido")
+        
+        if not estimate['unknown']:
+            # Sirve también de referencia para el progreso agregado
+            job.progress.size_hint = estimate['total_bytes']
+        
+        if estimate['total_bytes'] <= available:
+            return None
+        
+        if job.space_policy == "refuse" or job.download_type == "single":
+            self.log_message("❌ No hay espacio suficiente: descarga rechazada")
             return False
         
-        if download_path:
-            self.set_download_path(download_path)
+        # Recortar: se conservan las entradas en orden mientras quepan
+        kept = []
+        used = 0
+        for index, size in estimate['entries']:
+            if used + size > available:
+                break
+            kept.append(index)
+            used += size
         
-        self.is_downloading = True
+        if not kept:
+            self.log_message("❌ No cabe ninguna entrada: descarga rechazada")
+            return False
         
-        # Iniciar descarga en hilo separado
-        self.download_thread = threading.Thread(
-            target=self._download_thread,
-            args=(url, download_type, quality),
-            daemon=True
-        )
-        self.download_thread.start()
-        return True
+        self.log_message(f"✂️ Descarga recortada a {len(kept)} de {len(estimate['entries'])} entradas "
+                         f"({self._format_size(used)})")
+        if job.progress.size_hint:
+            job.progress.size_hint = used
+        return ','.join(str(index) for index in kept)
     
-    def _download_thread(self, url: str, download_type: str, quality: str):
+    @staticmethod
+    def _format_size(size: float) -> str:
         """
-        Hilo de descarga
+        Formatea un tamaño en bytes de forma legible
         """
-        try:
-            self.log_message("🚀 Iniciando descarga...")
-            self.log_message(f"📎 URL: {url}")
-            self.log_message(f"📥 Tipo: {'Playlist completa' if download_type == 'playlist' else 'Video individual'}")
-            self.log_message(f"🎥 Calidad: {quality}")
-            self.log_message(f"📁 Guardando en: {self.current_download_path}")
-            self.log_message("-" * 50)
-            
-            ydl_opts = self._get_ydl_options(quality, download_type)
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            
-            self.log_message("✅ ¡Descarga completada exitosamente!")
-            self.log_message(f"📁 Archivos guardados en: {self.current_download_path}")
-            
-            if self.progress_callback:
-                self.progress_callback("completed", None)
-                
-        except Exception as e:
-            error_msg = f"❌ Error durante la descarga: {str(e)}"
-            self.log_message(error_msg)
-            
-            if self.progress_callback:
-                self.progress_callback("error", error_msg)
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if abs(size) < 1024:
+                return f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
+    
+    def _get_sync_archive_path(self, url: str) -> Path:
+        """
+        Devuelve el archivo de IDs ya vistos para una URL de canal o playlist
+        """
+        sync_dir = self.data_dir / "sync"
+        sync_dir.mkdir(exist_ok=True)
+        key = hashlib.sha1(url.strip().encode('utf-8')).hexdigest()
+        return sync_dir / f"{key}.txt"
+    
+    def _count_sync_entries(self, url: str) -> int:
+        """
+        Cuenta los videos ya registrados para una URL sincronizada
+        """
+        archive_path = self._get_sync_archive_path(url)
+        if not archive_path.exists():
+            return 0
+        with open(archive_path, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+    
+    def _update_sync_index(self, url: str, clean: bool):
+        """
+        Guarda la fecha de la última sincronización de una URL
         
-        finally:
-            self.is_downloading = False
-            if self.progress_callback:
-                self.progress_callback("finished", None)
+        Args:
+            clean: Si la sincronización bajó todo lo que encontró. Si no, la
+                siguiente repasa la lista completa en lugar de parar en el
+                primer video ya registrado
+        """
+        index_path = self.data_dir / "sync" / "index.json"
+        with self._sync_lock:
+            index = self.get_sync_state()
+            index[url.strip()] = {
+                'archive': self._get_sync_archive_path(url).name,
+                'last_sync': datetime.now().isoformat(timespec='seconds'),
+                'known_videos': self._count_sync_entries(url),
+                'clean': clean
+            }
+            # Escritura atómica: un cierre a medias no deja el índice corrupto
+            temp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, index_path)
+            except OSError as e:
+                temp_path.unlink(missing_ok=True)
+                self.log_message(f"⚠️ No se pudo guardar el estado de sincronización: {e}")
     
-    def _get_ydl_options(self, quality: str, download_type: str) -> Dict:
+    def _sync_is_clean(self, url: str) -> bool:
         """
-        Configura las opciones de yt-dlp
+        Indica si la última sincronización de una URL no dejó entradas pendientes
         """
-        ydl_opts = {
-            'outtmpl': str(Path(self.current_download_path) / '%(title)s.%(ext)s'),
-            'writeinfojson': False,
-            'writeautomaticsub': False,
-            'ignoreerrors': True,
-        }
+        return self.get_sync_state().get(url.strip(), {}).get('clean', True)
+    
+    def get_sync_state(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado de todas las URLs sincronizadas
         
-        # Configurar formato según calidad
-        format_mapping = {
-            "480p": 'best[height<=480]',
-            "720p": 'best[height<=720]',
-            "1080p": 'best[height<=1080]',
-            "Mejor disponible": 'best',
-            "Audio únicamente": 'bestaudio/best'
-        }
+        Returns:
+            Dict URL -> {'archive', 'last_sync', 'known_videos', 'clean'}
+        """
+        index_path = self.data_dir / "sync" / "index.json"
+        if not index_path.exists():
+            return {}
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _build_filter_options(self, filters: Optional[Dict[str, Any]]) -> Dict:
+        """
+        Traduce los filtros de playlist a opciones de yt-dlp
         
-        ydl_opts['format'] = format_mapping.get(quality, 'best[height<=720]')
+        Se aplican al enumerar la playlist, de modo que las entradas que ya
+        se pueden descartar con los datos de la lista no se llegan a
+        resolver, y otra vez sobre cada entrada resuelta, para las que la
+        lista no traía datos suficientes (fecha de subida, duración).
         
-        # Configurar para playlist
-        if download_type == "playlist":
-            ydl_opts['noplaylist'] = False
-            ydl_opts['outtmpl'] = str(Path(self.current_download_path) / 
-                                    '%(playlist_title)s/%(playlist_index)02d - %(title)s.%(ext)s')
-        else:
-            ydl_opts['noplaylist'] = True
+        Args:
+            filters: Diccionario de filtros (ver start_download)
+            
+        Returns:
+            Dict con las opciones de yt-dlp correspondientes
+            
+        Raises:
+            ValueError: Si algún filtro tiene un formato inválido
+        """
+        if not filters:
+            return {}
         
-        # Hook de progreso
-        ydl_opts['progress_hooks'] = [self._progress_hook]
+        options = {}
         
-        return ydl_opts
+        # Rango de elementos ("1-10,15,20:30")
+        items = str(filters.get('items') or '').replace(' ', '')
+        if items:
+            try:
+                list(yt_dlp.utils.PlaylistEntries.parse_playlist_items(items))
+            except ValueError:
+                raise ValueError(f"rango de elementos no válido: {items}")
+            options['playlist_items'] = items
+        
+        # Duración mínima y máxima
+        conditions = []
+        min_duration = self._parse_duration(filters.get('min_duration'))
+        max_duration = self._parse_duration(filters.get('max_duration'))
+        if min_duration is not None and max_duration is not None and min_duration > max_duration:
+            raise ValueError("la duración mínima es mayor que la máxima")
+        if min_duration is not None:
+            conditions.append(f'duration >= {min_duration}')
+        if max_duration is not None:
+            conditions.append(f'duration <= {max_duration}')
+        if conditions:
+            options['match_filter'] = yt_dlp.utils.match_filter_func(' & '.join(conditions))
+        
+        # Ventana de fechas de subida
+        date_after = str(filters.get('date_after') or '').replace('-', '').strip()
+        date_before = str(filters.get('date_before') or '').replace('-', '').strip()
+        if date_after or date_before:
+            try:
+                options['daterange'] = yt_dlp.utils.DateRange(date_after or None, date_before or None)
+            except ValueError:
+                raise ValueError("las fechas deben tener el formato AAAAMMDD")
+        
+        # Expresión regular sobre el título
+        title_regex = filters.get('title_regex')
+        if title_regex:
+            try:
+                re.compile(title_regex)
+            except re.error as e:
+                raise ValueError(f"expresión regular no válida: {e}")
+            options['matchtitle'] = title_regex
+        
+        return options
+    
+    @staticmethod
+    def _parse_duration(value: Any) -> Optional[int]:
+        """
+        Convierte "90", "1:30" o "1:02:03" a segundos
+        """
+        if value is None or str(value).strip() == '':
+            return None
+        if isinstance(value, (int, float)):
+            return int(value)
+        
+        seconds = 0
+        try:
+            for part in str(value).strip().split(':'):
+                seconds = seconds * 60 + int(part)
+        except ValueError:
+            raise ValueError(f"duración no válida: {value}")
+        return seconds
+    
+    def _parse_clip(self, start_time: Any, end_time: Any) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Convierte el inicio y el fin de un tramo a segundos
+        
+        Returns:
+            (inicio, fin) o None si no se pidió tramo; fin es None para
+            descargar hasta el final
+            
+        Raises:
+            ValueError: Si algún tiempo es inválido o el fin no es posterior al inicio
+        """
+        start = self._parse_duration(start_time)
+        end = self._parse_duration(end_time)
+        if start is None and end is None:
+            return None
+        start = start or 0
+        if start < 0 or (end is not None and end <= start):
+            raise ValueError("el fin debe ser posterior al inicio")
+        return start, end
+    
+    @staticmethod
+    def _format_clock(seconds: float) -> str:
+        """
+        Formatea segundos como h:mm:ss (o m:ss)
+        """
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
     
-    def _progress_hook(self, d: Dict):
+    def _progress_hook(self, d: Dict, job: DownloadJob):
         """
         Hook de progreso de yt-dlp
         """
+        session = getattr(self._job_context, 'profile', None)
+        if session is None:
+            self._handle_progress(d, job)
+            return
+        
+        start = time.perf_counter()
+        try:
+            self._handle_progress(d, job)
+        finally:
+            session.record_hook(time.perf_counter() - start)
+    
+    def _notify_progress(self, status: str, data: Dict):
+        """
+        Llama al callback de progreso, midiendo su tiempo si se está perfilando
+        """
+        session = getattr(self._job_context, 'profile', None)
+        start = time.perf_counter()
+        self.progress_callback(status, data)
+        if session is not None:
+            session.callback_seconds += time.perf_counter() - start
+    
+    def _handle_progress(self, d: Dict, job: DownloadJob):
+        if job.cancelled:
+            # Interrumpe también el archivo en curso
+            raise yt_dlp.utils.DownloadCancelled("cancelada por el usuario")
+        
+        if job.adaptive:
+            job.adaptive.observe(d)
+        
         if d['status'] == 'downloading':
             filename = Path(d.get('filename', 'Archivo desconocido')).name
+            job.progress.update_file(d.get('filename', filename), d.get('downloaded_bytes') or 0,
+                                     d.get('total_bytes') or d.get('total_bytes_estimate'))
             
             progress_info = {
+                'job_id': job.job_id,
                 'filename': filename,
-                'status': 'downloading'
+                'status': 'downloading',
+                'overall': job.progress.snapshot()
             }
             
             if 'total_bytes' in d and d['total_bytes']:
@@ -322,34 +3934,49 @@ class VideoDownloader:
                 progress_msg = f"⬇️ {filename}: {downloaded_mb:.1f} MB descargados"
             
             if self.progress_callback:
-                self.progress_callback("progress", progress_info)
+                self._notify_progress("progress", progress_info)
             else:
                 # Fallback si no hay callback
                 print(f"\r{progress_msg}", end="", flush=True)
                 
         elif d['status'] == 'finished':
             filename = Path(d['filename']).name
+            size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            job.progress.update_file(d['filename'], size, size, downloading=False)
             self.log_message(f"✅ Completado: {filename}")
             
             if self.progress_callback:
-                self.progress_callback("file_completed", {'filename': filename})
+                self._notify_progress("file_completed", {'job_id': job.job_id, 'filename': filename,
+                                                         'overall': job.progress.snapshot()})
     
-    def cancel_download(self):
+    def cancel_download(self, job_id: Optional[str] = None):
         """
-        Cancela la descarga actual
+        Cancela una descarga o, sin job_id, todas las descargas en cola y en curso
         """
-        if self.is_downloading:
+        cancelled = self.scheduler.cancel(job_id)
+        if cancelled:
             self.log_message("⚠️ Cancelando descarga...")
-            self.log_message("ℹ️ La descarga actual se completará, pero no se iniciarán nuevas descargas")
-            self.is_downloading = False
+            self.log_message(f"ℹ️ Descargas canceladas: {cancelled}")
     
     def open_download_folder(self):
         """
         Abre la carpeta de descargas
         """
+        return self.open_folder(self.current_download_path)
+    
+    def open_log_folder(self):
+        """
+        Abre la carpeta del registro de actividad en disco
+        """
+        return self.open_folder(self.activity_log.path.parent)
+    
+    def open_folder(self, download_path):
+        """
+        Abre una carpeta con el explorador del sistema
+        """
         try:
-            download_path = Path(self.current_download_path)
-            download_path.mkdir(exist_ok=True)
+            download_path = Path(download_path)
+            download_path.mkdir(parents=True, exist_ok=True)
             
             if sys.platform.startswith('win'):
                 os.startfile(download_path)
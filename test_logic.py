@@ -0,0 +1,59 @@
+"""
+Pruebas de logic.py que no necesitan red
+
+Uso:
+    python -m pytest -q test_logic.py
+"""
+from logic import AdaptiveQuality, LibraryCatalog, VideoDownloader
+
+
+def formato(height: int, **campos) -> dict:
+    """
+    Formato progresivo (video y audio en un archivo) con la forma de yt-dlp
+    """
+    return {'format_id': str(height), 'height': height, 'vcodec': 'h264', 'acodec': 'aac', **campos}
+
+
+def test_adaptativa_formato_solo_con_tbr_sin_admision_previa():
+    # Sin la llamada previa del filtro de admisión no se conoce la duración
+    selector = AdaptiveQuality(target_seconds=60)
+    selector.speed = 1_000_000
+    formatos = [formato(240, tbr=400), formato(720, tbr=2500)]
+
+    elegido = next(selector({'formats': formatos}))
+
+    assert elegido['format_id'] == '240'
+    assert selector.choice['size'] is None
+
+
+def test_adaptativa_estima_con_tbr_y_duracion():
+    selector = AdaptiveQuality(target_seconds=60)
+    selector.duration = 600
+    formatos = [formato(h, tbr=t) for h, t in ((240, 400), (480, 1200), (720, 2500), (1080, 5000))]
+
+    # 2 MB/s durante 60 s con margen del 80%: caben 96 MB, el 480p ocupa 90 MB
+    selector.speed = 2_000_000
+    assert next(selector({'formats': formatos}))['format_id'] == '480'
+
+    # Si la conexión mejora vuelve a subir
+    selector.speed = 20_000_000
+    assert next(selector({'formats': formatos}))['format_id'] == '1080'
+
+
+def test_entrada_sin_archivo_no_cuenta_como_descargada():
+    # Las entradas rechazadas por match_filter vuelven sin 'filepath'
+    assert not VideoDownloader._was_downloaded(None)
+    assert not VideoDownloader._was_downloaded({'requested_downloads': [{'format_id': '18'}]})
+    assert VideoDownloader._was_downloaded({'requested_downloads': [{'filepath': '/tmp/v.mp4'}]})
+
+
+def test_catalogo_reconoce_el_id_en_los_nombres_propios(tmp_path):
+    catalogo = LibraryCatalog(tmp_path / "biblioteca.db")
+    nombres = {
+        'Video [dQw4w9WgXcQ].mp4': 'Video',
+        'Lista/03 - Video [dQw4w9WgXcQ].mp4': 'Video',
+        'Canal/20240131 - Video [dQw4w9WgXcQ] [60-150].mp4': 'Video',
+    }
+    for nombre, titulo in nombres.items():
+        info = catalogo._identify(str(tmp_path / nombre))
+        assert info == {'id': 'dQw4w9WgXcQ', 'title': titulo}